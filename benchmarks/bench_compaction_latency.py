@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import time
+from pathlib import Path
+
+from lcm.compactor import Compactor
+from lcm.engine import LCMEngine
+from lcm.metrics import Metrics
+from lcm.ratelimit import RateLimiter
+from lcm.testing import LATENCY_DISTRIBUTIONS, FakeLLMServer
+
+
+def make_msg(i: int) -> tuple[str, str]:
+    role = "user" if i % 2 else "assistant"
+    tok = random.randint(60, 180)
+    words = [f"m{i}", "context", "memory", "compression", "dag", "token", "budget"] * (tok // 7 + 1)
+    return role, " ".join(words[:tok])
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def run_case(server: FakeLLMServer, n: int, tau_soft: int, tau_hard: int, root: Path) -> dict:
+    limiter = RateLimiter(base_delay=0.05)
+    metrics = Metrics()
+    stalls: list[float] = []
+    metrics.add_span_hook(lambda span: stalls.append(span.duration * 1000) if span.name == "lcm_hard_stall" else None)
+    compactor = Compactor(api_base=server.api_base, api_key="bench", rate_limiter=limiter, metrics=metrics)
+    engine = LCMEngine(
+        root / f"store_{tau_soft}_{tau_hard}.jsonl",
+        tau_soft=tau_soft,
+        tau_hard=tau_hard,
+        compactor=compactor,
+        metrics=metrics,
+    )
+
+    latencies = []
+    try:
+        t0 = time.perf_counter()
+        for i in range(1, n + 1):
+            role, content = make_msg(i)
+            s = time.perf_counter()
+            engine.receive(role, content)
+            latencies.append((time.perf_counter() - s) * 1000)
+        ingest_s = time.perf_counter() - t0
+        engine.context.drain()
+        total_s = time.perf_counter() - t0
+        active_tokens = engine.context.get_active_context()["token_estimate"]
+    finally:
+        engine.close()
+        compactor.close()
+
+    return {
+        "tau_soft": tau_soft,
+        "tau_hard": tau_hard,
+        "messages": n,
+        "ingest_ms_p50": round(statistics.median(latencies), 3),
+        "ingest_ms_p99": round(percentile(latencies, 0.99), 3),
+        "ingest_ms_max": round(max(latencies), 3),
+        "hard_stalls": int(metrics.total("lcm_hard_stalls_total")),
+        "hard_stall_ms_total": round(metrics.total("lcm_hard_stall_seconds") * 1000, 3),
+        "hard_stall_ms_p99": round(percentile(stalls, 0.99), 3),
+        "throughput_msgs_per_s": round(n / ingest_s, 2),
+        "drain_ms": round((total_s - ingest_s) * 1000, 3),
+        "compress_calls": dict(compactor.compress_stats),
+        "limiter": dict(limiter.stats),
+        "active_tokens": active_tokens,
+    }
+
+
+def parse_taus(spec: str) -> list[tuple[int, int]]:
+    pairs = []
+    for item in spec.split(","):
+        soft, hard = item.split(":")
+        pairs.append((int(soft), int(hard)))
+    return pairs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compaction latency against a local fake LLM endpoint.")
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--taus", default="1500:2500,3000:4500,4000:6000", help="comma-separated soft:hard pairs")
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--latency-spread", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rps", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=None, help="write JSON results here as well as stdout")
+    args = parser.parse_args()
+
+    os.environ.pop("LCM_DISABLE_LLM", None)
+    random.seed(args.seed)
+    root = Path(".bench_data/compaction_latency")
+    shutil.rmtree(root, ignore_errors=True)
+    root.mkdir(parents=True)
+
+    server_cfg = {
+        "latency": args.latency,
+        "latency_ms": args.latency_ms,
+        "latency_spread": args.latency_spread,
+        "error_rate": args.error_rate,
+        "rate_limit_rps": args.rate_limit_rps,
+        "seed": args.seed,
+    }
+    results = []
+    for tau_soft, tau_hard in parse_taus(args.taus):
+        with FakeLLMServer(**server_cfg) as server:
+            case = run_case(server, args.messages, tau_soft, tau_hard, root)
+            case["server"] = dict(server.stats)
+        print(json.dumps(case))
+        results.append(case)
+
+    if args.output:
+        args.output.write_text(json.dumps({"config": server_cfg, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ import tracemalloc
 from pathlib import Path
 
 from lcm.engine import LCMEngine
+from lcm.metrics import Metrics
 
 
 def make_msg(i: int) -> tuple[str, str]:
@@ -16,7 +17,8 @@ def make_msg(i: int) -> tuple[str, str]:
 
 
 def run_case(n: int, root: Path) -> dict:
-    engine = LCMEngine(root / f"store_{n}.jsonl", tau_soft=4000, tau_hard=6000)
+    metrics = Metrics()
+    engine = LCMEngine(root / f"store_{n}.jsonl", tau_soft=4000, tau_hard=6000, metrics=metrics)
     add_latencies = []
 
     tracemalloc.start()
@@ -30,21 +32,25 @@ def run_case(n: int, root: Path) -> dict:
     current, peak = tracemalloc.get_traced_memory()
     tracemalloc.stop()
 
+    engine.context.drain()
     active = engine.context.get_active_context()
-    depth = max((node.level for node in engine.dag.nodes.values()), default=0)
     compress_calls = sum(engine.compactor.compress_stats.values())
-    compress_time_ms = total_ms - sum(add_latencies)
+    receive = metrics.histogram("lcm_receive_seconds")
 
     return {
         "messages": n,
         "add_latency_ms_avg": round(sum(add_latencies) / len(add_latencies), 3),
         "add_latency_ms_p95": round(sorted(add_latencies)[int(len(add_latencies) * 0.95) - 1], 3),
-        "compress_time_ms_est": round(max(0.0, compress_time_ms), 3),
+        "receive_p99_ms_bucket": round(receive["p99"] * 1000, 3),
+        "total_ms": round(total_ms, 3),
+        "compress_time_ms": round(metrics.total("lcm_compaction_seconds") * 1000, 3),
+        "hard_stall_ms": round(metrics.total("lcm_hard_stall_seconds") * 1000, 3),
+        "hard_stalls": int(metrics.total("lcm_hard_stalls_total")),
         "compress_calls": compress_calls,
         "memory_current_mb": round(current / 1024 / 1024, 3),
         "memory_peak_mb": round(peak / 1024 / 1024, 3),
         "dag_nodes": len(engine.dag.nodes),
-        "dag_depth": depth,
+        "dag_depth": engine.dag.depth,
         "active_tokens": active["token_estimate"],
     }
 
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from lcm.dag import SummaryDAG
+from lcm.engine import LCMEngine
+from lcm.store import ImmutableStore, Message
+
+BATCH = 10_000
+# Reference results compared against by default. It holds the 10k and 100k cases; sizes missing from it are
+# only checked for scaling. Regenerate it with `--baseline '' --output <this file>` on the reference runner.
+BASELINE = Path(__file__).with_name("baselines") / "scaling.json"
+LEAF_MESSAGES = 16
+FANOUT = 8
+
+# Gated metrics, all lower-is-better: name -> (expected growth exponent in n, noise floor).
+# A per-operation cost should stay flat (exponent 0); a whole-history operation grows linearly
+# (exponent 1). Differences below the floor are treated as noise in both checks.
+CHECKS: dict[str, tuple[float, float]] = {
+    "store.append_us_per_msg": (0, 5.0),
+    "store.open_s": (1, 0.05),
+    "store.get_by_id_p50_us": (0, 5.0),
+    "store.get_by_id_p99_us": (0, 20.0),
+    "store.get_by_ids_100_p50_us": (0, 200.0),
+    "store.query_time_range_100_p50_us": (0, 200.0),
+    "dag.add_us_per_node": (0, 5.0),
+    "dag.expand_l1_p50_us": (0, 5.0),
+    "dag.covering_p50_us": (0, 5.0),
+    "dag.expand_roots_us_per_msg": (0, 0.5),
+    "dag.save_s": (1, 0.05),
+    "dag.load_s": (1, 0.05),
+    "bootstrap.replay_us_per_msg": (0, 20.0),
+    "bootstrap.reopen_s": (1, 0.05),
+    "bootstrap.tail_replay_us_per_msg": (0, 20.0),
+    "peak_rss_mb": (1, 32.0),
+}
+
+
+def make_records(n: int, seed: int) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    vocab = ["context", "memory", "compression", "dag", "token", "budget", "store", "segment", "index", "summary"]
+    return [
+        ("user" if i % 2 else "assistant", " ".join([f"m{i}", *rng.choices(vocab, k=rng.randint(12, 30))]))
+        for i in range(n)
+    ]
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def timed_us(fn: Callable[[], object]) -> float:
+    s = time.perf_counter()
+    fn()
+    return (time.perf_counter() - s) * 1e6
+
+
+def fill_store(store: ImmutableStore, n: int, seed: int) -> tuple[list[str], list[str], float]:
+    ids: list[str] = []
+    timestamps: list[str] = []
+    records = make_records(n, seed)
+    t0 = time.perf_counter()
+    for i in range(0, n, BATCH):
+        for msg in store.append_many(records[i : i + BATCH]):
+            ids.append(msg.id)
+            timestamps.append(msg.timestamp)
+    return ids, timestamps, time.perf_counter() - t0
+
+
+def bench_store(n: int, root: Path, lookups: int, seed: int) -> dict[str, float]:
+    rng = random.Random(seed)
+    store = ImmutableStore(root / "store.jsonl")
+    ids, timestamps, append_s = fill_store(store, n, seed)
+    store.close()
+
+    t0 = time.perf_counter()
+    store = ImmutableStore(root / "store.jsonl")
+    open_s = time.perf_counter() - t0
+
+    # Inputs are drawn up front so sampling and timestamp parsing stay out of the timed calls.
+    batches = [rng.sample(ids, min(n, 100)) for _ in range(max(1, lookups // 20))]
+    ranges = []
+    for _ in range(max(1, lookups // 20)):
+        i = rng.randrange(max(1, n - 100))
+        ranges.append(tuple(datetime.fromisoformat(timestamps[j]) for j in (i, min(n - 1, i + 99))))
+
+    single = [timed_us(lambda mid=mid: store.get_by_id(mid)) for mid in rng.choices(ids, k=lookups)]
+    batched = [timed_us(lambda batch=batch: store.get_by_ids(batch)) for batch in batches]
+    windows = [timed_us(lambda start=start, end=end: store.query_time_range(start, end)) for start, end in ranges]
+    store.close()
+    return {
+        "store.append_msgs_per_s": round(n / append_s, 1),
+        "store.append_us_per_msg": round(append_s * 1e6 / n, 3),
+        "store.open_s": round(open_s, 4),
+        "store.get_by_id_p50_us": round(statistics.median(single), 2),
+        "store.get_by_id_p99_us": round(percentile(single, 0.99), 2),
+        "store.get_by_ids_100_p50_us": round(statistics.median(batched), 2),
+        "store.get_by_ids_100_p99_us": round(percentile(batched, 0.99), 2),
+        "store.query_time_range_100_p50_us": round(statistics.median(windows), 2),
+        "store.query_time_range_100_p99_us": round(percentile(windows, 0.99), 2),
+    }
+
+
+def bench_dag(n: int, root: Path, lookups: int, seed: int) -> dict[str, float]:
+    rng = random.Random(seed)
+    dag = SummaryDAG()
+    dag.token_counter("warm up the encoder outside the timed build")
+    t0 = time.perf_counter()
+    level = [
+        dag.add_summary(
+            [Message(id=f"m{j}", timestamp="", role="user", content="") for j in range(i, min(n, i + LEAF_MESSAGES))],
+            f"leaf summary {i}",
+        ).id
+        for i in range(0, n, LEAF_MESSAGES)
+    ]
+    leaves = list(level)
+    while len(level) > FANOUT:
+        level = [
+            dag.add_summary([], f"merged summary {i}", child_node_ids=level[i : i + FANOUT]).id
+            for i in range(0, len(level), FANOUT)
+        ]
+    build_s = time.perf_counter() - t0
+
+    expand = [timed_us(lambda nid=nid: dag.expand(nid)) for nid in rng.choices(leaves, k=lookups)]
+    covering = [timed_us(lambda i=i: dag.covering(f"m{i}")) for i in rng.choices(range(n), k=lookups)]
+    roots_us = timed_us(lambda: [dag.expand(node.id) for node in dag.roots()])
+
+    path = root / "dag.json"
+    t0 = time.perf_counter()
+    dag.save(path)
+    save_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    SummaryDAG.load(path)
+    load_s = time.perf_counter() - t0
+    return {
+        "dag.nodes": len(dag.nodes),
+        "dag.depth": dag.depth,
+        "dag.add_us_per_node": round(build_s * 1e6 / len(dag.nodes), 3),
+        "dag.expand_l1_p50_us": round(statistics.median(expand), 2),
+        "dag.expand_l1_p99_us": round(percentile(expand, 0.99), 2),
+        "dag.covering_p50_us": round(statistics.median(covering), 2),
+        "dag.covering_p99_us": round(percentile(covering, 0.99), 2),
+        "dag.expand_roots_us_per_msg": round(roots_us / n, 4),
+        "dag.save_s": round(save_s, 4),
+        "dag.load_s": round(load_s, 4),
+        "dag.file_mb": round(path.stat().st_size / 1024 / 1024, 2),
+    }
+
+
+def bench_bootstrap(n: int, root: Path, lookups: int, seed: int) -> dict[str, float]:
+    path = root / "store.jsonl"
+    store = ImmutableStore(path)
+    fill_store(store, n, seed)
+    store.close()
+
+    # Cold start: the whole history is replayed through the context (and journaled to the DAG).
+    engine = LCMEngine(path, search_index=False, checkpoint=True)
+    t0 = time.perf_counter()
+    engine.bootstrap_from_store()
+    replay_s = time.perf_counter() - t0
+    engine.close()
+
+    tail = max(100, n // 100)
+    store = ImmutableStore(path)
+    fill_store(store, tail, seed + 1)
+    store.close()
+
+    # Warm start: restore the checkpoint, then replay only what arrived after it.
+    t0 = time.perf_counter()
+    engine = LCMEngine(path, search_index=False, checkpoint=True)
+    reopen_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    engine.bootstrap_from_store()
+    tail_s = time.perf_counter() - t0
+    result = {
+        "bootstrap.replay_msgs_per_s": round(n / replay_s, 1),
+        "bootstrap.replay_us_per_msg": round(replay_s * 1e6 / n, 3),
+        "bootstrap.reopen_s": round(reopen_s, 4),
+        "bootstrap.tail_messages": tail,
+        "bootstrap.tail_replay_us_per_msg": round(tail_s * 1e6 / tail, 3),
+        "bootstrap.dag_nodes": len(engine.dag.nodes),
+    }
+    engine.close()
+    return result
+
+
+PATHS: dict[str, Callable[[int, Path, int, int], dict[str, float]]] = {
+    "store": bench_store,
+    "dag": bench_dag,
+    "bootstrap": bench_bootstrap,
+}
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def run_case(name: str, n: int, root: Path, lookups: int, seed: int) -> dict:
+    """Runs in a fresh worker process so `peak_rss_mb` belongs to this case alone."""
+    os.environ["LCM_DISABLE_LLM"] = "1"
+    case_root = root / f"{name}_{n}"
+    shutil.rmtree(case_root, ignore_errors=True)
+    case_root.mkdir(parents=True)
+    t0 = time.perf_counter()
+    try:
+        metrics = PATHS[name](n, case_root, lookups, seed)
+    finally:
+        shutil.rmtree(case_root, ignore_errors=True)
+    metrics["wall_s"] = round(time.perf_counter() - t0, 3)
+    metrics["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return {"path": name, "messages": n, "metrics": metrics}
+
+
+def compare_baseline(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """Gated metrics more than `tolerance` (a fraction) worse than the baseline case of the same path and size."""
+    previous = {(case["path"], case["messages"]): case["metrics"] for case in baseline}
+    failures = []
+    for case in results:
+        before = previous.get((case["path"], case["messages"]))
+        if before is None:
+            continue
+        for metric, value in case["metrics"].items():
+            if metric not in CHECKS or metric not in before:
+                continue
+            limit = before[metric] * (1 + tolerance)
+            if value > limit and value - before[metric] > CHECKS[metric][1]:
+                failures.append(
+                    f"{case['path']}@{case['messages']}: {metric} {value} > baseline {before[metric]} (+{tolerance:.0%})"
+                )
+    return failures
+
+
+def check_scaling(results: list[dict], slack: float) -> list[str]:
+    """Fit the growth exponent of each gated metric between the smallest and largest size of a path."""
+    failures = []
+    for name in PATHS:
+        cases = sorted((c for c in results if c["path"] == name), key=lambda c: c["messages"])
+        if len(cases) < 2:
+            continue
+        small, large = cases[0], cases[-1]
+        n_ratio = large["messages"] / small["messages"]
+        for metric, (expected, floor) in CHECKS.items():
+            a, b = small["metrics"].get(metric), large["metrics"].get(metric)
+            if a is None or b is None or b <= floor:
+                continue
+            exponent = math.log(b / max(a, floor)) / math.log(n_ratio)
+            if exponent > expected + slack:
+                failures.append(
+                    f"{name}: {metric} grows as n^{exponent:.2f} from {small['messages']} to {large['messages']}"
+                    f" messages ({a} -> {b}); expected at most n^{expected}"
+                )
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Store, DAG and bootstrap scaling with regression gates.")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated message counts")
+    parser.add_argument("--paths", default=",".join(PATHS), help=f"comma-separated subset of {','.join(PATHS)}")
+    parser.add_argument("--lookups", type=int, default=2000, help="sampled point lookups per latency metric")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=None, help="write JSON results here (usable as a baseline)")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=BASELINE,
+        help="previous --output to compare against (default: the checked-in baseline; pass '' to skip)",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed fractional slowdown vs the baseline")
+    parser.add_argument("--scaling-slack", type=float, default=0.4, help="allowed excess growth exponent")
+    args = parser.parse_args()
+
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+    names = args.paths.split(",")
+    unknown = set(names) - set(PATHS)
+    if unknown:
+        parser.error(f"unknown paths: {', '.join(sorted(unknown))}")
+    root = Path(".bench_data/scaling")
+    root.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    for name in names:
+        for n in sizes:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                case = pool.submit(run_case, name, n, root, args.lookups, args.seed).result()
+            print(json.dumps(case), flush=True)
+            results.append(case)
+
+    report = {"sizes": sizes, "python": sys.version.split()[0], "results": results}
+    failures = check_scaling(results, args.scaling_slack)
+    if args.baseline.name:
+        failures += compare_baseline(results, json.loads(args.baseline.read_text())["results"], args.tolerance)
+    report["failures"] = failures
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    for line in failures:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
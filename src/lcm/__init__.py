@@ -1,17 +1,35 @@
 """LCM Prototype package."""
 
-from .store import ImmutableStore, Message
+from .store import ImmutableStore, Message, MessageStore
+from .sqlite_store import SQLiteStore
 from .dag import SummaryDAG, SummaryNode
-from .compactor import Compactor
-from .context import ContextManager
-from .engine import LCMEngine
+from .cache import SummaryCache
+from .compactor import AsyncCompactor, Compactor
+from .context import AsyncContextManager, ContextManager
+from .engine import AsyncLCMEngine, LCMEngine
+from .metrics import Metrics, NullMetrics
+from .ratelimit import RateLimiter
+from .sessions import SessionManager
+from .tokens import TokenCounter, default_token_counter
 
 __all__ = [
     "ImmutableStore",
     "Message",
+    "MessageStore",
+    "SQLiteStore",
     "SummaryDAG",
     "SummaryNode",
+    "SummaryCache",
     "Compactor",
+    "AsyncCompactor",
     "ContextManager",
+    "AsyncContextManager",
     "LCMEngine",
+    "AsyncLCMEngine",
+    "Metrics",
+    "NullMetrics",
+    "RateLimiter",
+    "SessionManager",
+    "TokenCounter",
+    "default_token_counter",
 ]
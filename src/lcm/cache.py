@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+class SummaryCache:
+    """On-disk, content-addressed cache of LLM summaries with size-bounded LRU eviction."""
+
+    def __init__(self, directory: str | Path, *, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> entry size, least recently used first. Recency survives restarts via file mtimes.
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        self.stats: dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+        for tmp in self.directory.glob("*/*.tmp"):
+            tmp.unlink()
+        files = sorted(self.directory.glob("*/*.txt"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            size = path.stat().st_size
+            self._entries[path.stem] = size
+            self._total_bytes += size
+        self._evict()
+
+    @staticmethod
+    def make_key(source: str, style: str, target_tokens: int, model: str) -> str:
+        source_hash = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        return hashlib.sha256(json.dumps([source_hash, style, target_tokens, model]).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.txt"
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            if key not in self._entries:
+                self.stats["misses"] += 1
+                return None
+            path = self._path(key)
+            try:
+                text = path.read_text(encoding="utf-8")
+                os.utime(path)
+            except OSError:
+                self._total_bytes -= self._entries.pop(key)
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return text
+
+    def put(self, key: str, text: str) -> None:
+        data = text.encode("utf-8")
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.stats["evictions"] += 1
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,43 +1,90 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import math
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Callable
 
 import httpx
 
+from .cache import SummaryCache
+from .metrics import NULL_METRICS, NullMetrics
+from .ratelimit import RateLimiter
 from .store import Message
+from .tokens import TokenCounter, default_token_counter
 
 
-class Compactor:
-    """Three-stage compactor with deterministic fallback and optional Kimi-backed LLM compression."""
+class _CompactorBase:
+    """Ladder planning, request building and fallbacks shared by `Compactor` and `AsyncCompactor`."""
 
     def __init__(
         self,
         *,
-        token_counter: Callable[[str], int] | None = None,
+        token_counter: TokenCounter | Callable[[str], int] | None = None,
         model: str = "kimi-k2.5",
         api_base: str = "https://api.moonshot.cn/v1",
         api_key: str | None = None,
         timeout: float = 20.0,
+        client: httpx.Client | httpx.AsyncClient | None = None,
+        rate_limiter: RateLimiter | None = None,
+        cache: SummaryCache | None = None,
+        speculative: bool = False,
+        ladder_min_samples: int = 4,
+        ladder_min_fit_rate: float = 0.2,
+        ladder_probe_every: int = 16,
+        max_source_tokens: int = 8000,
+        metrics: NullMetrics = NULL_METRICS,
     ):
-        self.token_counter = token_counter or self._default_token_counter
+        if token_counter is None:
+            token_counter = default_token_counter()
+        elif not isinstance(token_counter, TokenCounter):
+            token_counter = TokenCounter(counter=token_counter)
+        self.token_counter: TokenCounter = token_counter
         self.model = model
         self.api_base = api_base.rstrip("/")
         self.timeout = timeout
+        # Largest source text one compress request should carry; callers split bigger inputs first.
+        self.max_source_tokens = max_source_tokens
         disable_llm = os.getenv("LCM_DISABLE_LLM", "0") == "1"
         self.api_key = None if disable_llm else (api_key or os.getenv("KIMI_API_KEY") or self._load_key_from_openviking_config())
-        self._client = httpx.Client(timeout=self.timeout)
+        self._client = client if client is not None else self._make_client()
+        self._owns_client = client is None
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.cache = cache
+        self.metrics = metrics
         self.compress_stats: dict[str, int] = {
             "normal": 0,
             "aggressive": 0,
             "deterministic_fallback": 0,
         }
+        # Predictive ladder: per (level, log2 source/target ratio) outcomes as [fits, attempts, skips_since_attempt].
+        # A level that rarely fits at a given ratio is skipped, but re-probed every `ladder_probe_every` skips.
+        self.speculative = speculative
+        self.ladder_min_samples = ladder_min_samples
+        self.ladder_min_fit_rate = ladder_min_fit_rate
+        self.ladder_probe_every = ladder_probe_every
+        self._ladder: dict[tuple[str, int], list[int]] = {}
+        self._ladder_lock = threading.Lock()
+
+    def _make_client(self) -> httpx.Client | httpx.AsyncClient:
+        raise NotImplementedError
+
+    @property
+    def cache_stats(self) -> dict[str, int]:
+        return dict(self.cache.stats) if self.cache is not None else {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _cache_key(self, messages: list[Message], style: str, max_tokens: int) -> str | None:
+        if self.cache is None:
+            return None
+        return self.cache.make_key(self._build_source_text(messages), style, max_tokens, self.model)
 
     @staticmethod
     def _default_token_counter(text: str) -> int:
-        return max(1, len(text.split())) if text.strip() else 0
+        return TokenCounter.word_count(text)
 
     @staticmethod
     def _load_key_from_openviking_config() -> str | None:
@@ -51,12 +98,12 @@ class Compactor:
             return None
 
     def count_messages_tokens(self, messages: list[Message]) -> int:
-        return sum(self.token_counter(m.content) for m in messages)
+        return sum(self.token_counter.count_many([m.content for m in messages]))
 
     def _build_source_text(self, messages: list[Message]) -> str:
         return "\n".join(f"{m.role}: {m.content.strip()}" for m in messages if m.content.strip())
 
-    def _llm_compress(self, messages: list[Message], style: str, max_tokens: int) -> str:
+    def _build_request(self, messages: list[Message], style: str) -> tuple[dict, int]:
         if not self.api_key:
             raise RuntimeError("Kimi API key is not configured")
 
@@ -77,54 +124,55 @@ class Compactor:
             "temperature": 0.3,
             "max_tokens": 2000,
         }
-        url = f"{self.api_base}/chat/completions"
-        resp = self._client.post(
-            url,
-            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
-            json=payload,
-        )
-        if resp.status_code >= 400 and "only 1 is allowed" in resp.text:
-            payload["temperature"] = 1
-            resp = self._client.post(
-                url,
-                headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
-                json=payload,
-            )
+        return payload, self.token_counter(source) + payload["max_tokens"]
+
+    @staticmethod
+    def _parse_response(resp: httpx.Response, style: str) -> str:
         resp.raise_for_status()
         data = resp.json()
         text = data["choices"][0]["message"]["content"].strip()
-        import time
-        time.sleep(2)
         return f"[{style.upper()}] {text}"
 
-    def normal_compress(self, messages: list[Message], target_tokens: int | None = None) -> str:
-        budget = max(80, target_tokens or 220)
-        try:
-            return self._llm_compress(messages, style="normal", max_tokens=budget)
-        except Exception:
-            merged = " ".join(m.content.strip() for m in messages if m.content.strip())
-            words = merged.split()
-            keep = min(120, len(words))
-            return "[NORMAL] " + " ".join(words[:keep])
+    @staticmethod
+    def _needs_temperature_retry(resp: httpx.Response) -> bool:
+        return resp.status_code >= 400 and "only 1 is allowed" in resp.text
 
-    def aggressive_compress(self, messages: list[Message], target_tokens: int | None = None) -> str:
-        budget = max(40, target_tokens or 120)
+    @staticmethod
+    def _retry_after(resp: httpx.Response) -> float | None:
         try:
-            return self._llm_compress(messages, style="aggressive", max_tokens=budget)
-        except Exception:
-            bullets = []
-            for msg in messages:
-                first = msg.content.strip().split(".")[0][:120]
-                if first:
-                    bullets.append(f"- ({msg.role}) {first}")
-            return "[AGGRESSIVE]\n" + "\n".join(bullets[:12])
+            return float(resp.headers["retry-after"])
+        except (KeyError, ValueError):
+            return None
 
-    def deterministic_fallback(self, messages: list[Message], max_tokens: int) -> str:
+    def _headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+
+    @staticmethod
+    def _normal_truncate(messages: list[Message]) -> str:
+        merged = " ".join(m.content.strip() for m in messages if m.content.strip())
+        words = merged.split()
+        keep = min(120, len(words))
+        return "[NORMAL] " + " ".join(words[:keep])
+
+    @staticmethod
+    def _aggressive_bullets(messages: list[Message]) -> str:
+        bullets = []
+        for msg in messages:
+            first = msg.content.strip().split(".")[0][:120]
+            if first:
+                bullets.append(f"- ({msg.role}) {first}")
+        return "[AGGRESSIVE]\n" + "\n".join(bullets[:12])
+
+    @staticmethod
+    def _fallback_words(messages: list[Message]) -> list[str]:
+        chunks = [f"{m.role}: {m.content}" for m in messages]
+        return " ".join(chunks).split()
+
+    @staticmethod
+    def _fallback_from_words(all_words: list[str], max_tokens: int) -> str:
         if max_tokens <= 0:
             return "[FALLBACK]"
 
-        chunks = [f"{m.role}: {m.content}" for m in messages]
-        all_words = " ".join(chunks).split()
         if len(all_words) <= max_tokens:
             return "[FALLBACK] " + " ".join(all_words)
 
@@ -137,20 +185,247 @@ class Compactor:
         tail = all_words[-tail_n:] if tail_n > 0 else []
         return "[FALLBACK] " + " ".join(head + ["..."] + tail)
 
-    def compress(self, messages: list[Message], target_tokens: int) -> tuple[str, str]:
-        normal = self.normal_compress(messages, target_tokens=target_tokens)
-        if self.token_counter(normal) <= target_tokens:
-            self.compress_stats["normal"] += 1
-            return "normal", normal
-
-        aggressive = self.aggressive_compress(messages, target_tokens=target_tokens)
-        if self.token_counter(aggressive) <= target_tokens:
-            self.compress_stats["aggressive"] += 1
-            return "aggressive", aggressive
-
-        fallback = self.deterministic_fallback(messages, max_tokens=target_tokens)
-        while self.token_counter(fallback) > target_tokens and target_tokens > 1:
-            target_tokens -= 1
-            fallback = self.deterministic_fallback(messages, max_tokens=target_tokens)
-        self.compress_stats["deterministic_fallback"] += 1
+    def deterministic_fallback(self, messages: list[Message], max_tokens: int) -> str:
+        return self._fallback_from_words(self._fallback_words(messages), max_tokens)
+
+    def _fallback_within(self, messages: list[Message], target_tokens: int) -> tuple[str, str]:
+        # Largest word cut whose rendering fits the token budget, found by bisection.
+        words = self._fallback_words(messages)
+        fallback = self._fallback_from_words(words, target_tokens)
+        if self.token_counter(fallback) > target_tokens and target_tokens > 1:
+            lo, hi = 1, target_tokens - 1
+            fallback = self._fallback_from_words(words, 1)
+            while lo <= hi:
+                mid = (lo + hi) // 2
+                candidate = self._fallback_from_words(words, mid)
+                if self.token_counter(candidate) <= target_tokens:
+                    fallback, lo = candidate, mid + 1
+                else:
+                    hi = mid - 1
+        self._record_level("deterministic_fallback")
         return "deterministic_fallback", fallback
+
+    def _record_level(self, level: str) -> None:
+        self.compress_stats[level] += 1
+        self.metrics.inc("lcm_compress_total", level=level)
+
+    def _ratio_bucket(self, messages: list[Message], target_tokens: int) -> int:
+        ratio = max(1, self.count_messages_tokens(messages)) / max(1, target_tokens)
+        return min(16, max(0, int(math.log2(ratio))))
+
+    def _plan_levels(self, messages: list[Message], target_tokens: int) -> tuple[list[str], int]:
+        """LLM levels worth trying for this block, predicted from past outcomes at a similar ratio."""
+        bucket = self._ratio_bucket(messages, target_tokens)
+        levels = []
+        with self._ladder_lock:
+            for level in ("normal", "aggressive"):
+                fits, attempts, skips = self._ladder.setdefault((level, bucket), [0, 0, 0])
+                unlikely = attempts >= self.ladder_min_samples and fits < self.ladder_min_fit_rate * attempts
+                if unlikely and skips + 1 < self.ladder_probe_every:
+                    self._ladder[(level, bucket)][2] += 1
+                    continue
+                levels.append(level)
+        return levels, bucket
+
+    def _accept(self, level: str, text: str, target_tokens: int, bucket: int) -> bool:
+        fits = self.token_counter(text) <= target_tokens
+        with self._ladder_lock:
+            entry = self._ladder.setdefault((level, bucket), [0, 0, 0])
+            entry[0] += int(fits)
+            entry[1] += 1
+            entry[2] = 0
+        return fits
+
+
+class Compactor(_CompactorBase):
+    """Three-stage compactor with deterministic fallback and optional Kimi-backed LLM compression."""
+
+    def __init__(self, *, client: httpx.Client | None = None, **kwargs):
+        super().__init__(client=client, **kwargs)
+        # Built up front: the compactor is shared by compaction workers, so lazy creation could race.
+        self._speculative_pool: ThreadPoolExecutor | None = (
+            ThreadPoolExecutor(max_workers=4, thread_name_prefix="lcm-speculative") if self.speculative else None
+        )
+
+    def _make_client(self) -> httpx.Client:
+        return httpx.Client(timeout=self.timeout)
+
+    def close(self) -> None:
+        if self._owns_client:
+            self._client.close()
+        if self._speculative_pool is not None:
+            self._speculative_pool.shutdown(wait=False)
+
+    def _llm_compress(self, messages: list[Message], style: str, max_tokens: int) -> str:
+        key = self._cache_key(messages, style, max_tokens)
+        if key is not None and (cached := self.cache.get(key)) is not None:
+            return cached
+        payload, tokens = self._build_request(messages, style)
+        resp = self._post_with_retry(payload, tokens)
+        if self._needs_temperature_retry(resp):
+            payload["temperature"] = 1
+            resp = self._post_with_retry(payload, tokens)
+        text = self._parse_response(resp, style)
+        if key is not None:
+            self.cache.put(key, text)
+        return text
+
+    def _post_with_retry(self, payload: dict, tokens: int) -> httpx.Response:
+        limiter = self.rate_limiter
+        headers = self._headers()
+        attempt = 0
+        while True:
+            try:
+                with limiter.slot(tokens), self.metrics.span("lcm_llm_request", status="error") as span:
+                    resp = self._client.post(f"{self.api_base}/chat/completions", headers=headers, json=payload)
+                    span.label(status=resp.status_code)
+            except httpx.TransportError:
+                if attempt >= limiter.max_retries:
+                    limiter.record("failed")
+                    raise
+                delay = limiter.backoff(attempt)
+            else:
+                if resp.status_code not in limiter.retry_statuses:
+                    return resp
+                if attempt >= limiter.max_retries:
+                    limiter.record("failed")
+                    return resp
+                delay = limiter.backoff(attempt, self._retry_after(resp))
+            limiter.record("retried")
+            self.metrics.inc("lcm_llm_retries_total")
+            limiter.sleep(delay)
+            attempt += 1
+
+    def normal_compress(self, messages: list[Message], target_tokens: int | None = None) -> str:
+        budget = max(80, target_tokens or 220)
+        try:
+            return self._llm_compress(messages, style="normal", max_tokens=budget)
+        except Exception:
+            return self._normal_truncate(messages)
+
+    def aggressive_compress(self, messages: list[Message], target_tokens: int | None = None) -> str:
+        budget = max(40, target_tokens or 120)
+        try:
+            return self._llm_compress(messages, style="aggressive", max_tokens=budget)
+        except Exception:
+            return self._aggressive_bullets(messages)
+
+    def _run_level(self, level: str, messages: list[Message], target_tokens: int) -> str:
+        if level == "normal":
+            return self.normal_compress(messages, target_tokens=target_tokens)
+        return self.aggressive_compress(messages, target_tokens=target_tokens)
+
+    def compress(self, messages: list[Message], target_tokens: int) -> tuple[str, str]:
+        levels, bucket = self._plan_levels(messages, target_tokens)
+        if self._speculative_pool is not None and len(levels) > 1:
+            futures = [self._speculative_pool.submit(self._run_level, lvl, messages, target_tokens) for lvl in levels]
+            chosen = None
+            for level, future in zip(levels, futures):
+                if self._accept(level, future.result(), target_tokens, bucket) and chosen is None:
+                    chosen = (level, future.result())
+            if chosen is not None:
+                self._record_level(chosen[0])
+                return chosen
+        else:
+            for level in levels:
+                text = self._run_level(level, messages, target_tokens)
+                if self._accept(level, text, target_tokens, bucket):
+                    self._record_level(level)
+                    return level, text
+        return self._fallback_within(messages, target_tokens)
+
+
+class AsyncCompactor(_CompactorBase):
+    """Compactor whose LLM stages are coroutines over a (shareable) pooled httpx.AsyncClient."""
+
+    def __init__(self, *, client: httpx.AsyncClient | None = None, **kwargs):
+        super().__init__(client=client, **kwargs)
+
+    def _make_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(timeout=self.timeout)
+
+    def close(self) -> None:
+        raise TypeError("AsyncCompactor holds an async HTTP client; close it with `await aclose()`")
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self._client.aclose()
+
+    async def _post_with_retry(self, payload: dict, tokens: int) -> httpx.Response:
+        limiter = self.rate_limiter
+        headers = self._headers()
+        attempt = 0
+        while True:
+            try:
+                async with limiter.aslot(tokens):
+                    with self.metrics.span("lcm_llm_request", status="error") as span:
+                        resp = await self._client.post(f"{self.api_base}/chat/completions", headers=headers, json=payload)
+                        span.label(status=resp.status_code)
+            except httpx.TransportError:
+                if attempt >= limiter.max_retries:
+                    limiter.record("failed")
+                    raise
+                delay = limiter.backoff(attempt)
+            else:
+                if resp.status_code not in limiter.retry_statuses:
+                    return resp
+                if attempt >= limiter.max_retries:
+                    limiter.record("failed")
+                    return resp
+                delay = limiter.backoff(attempt, self._retry_after(resp))
+            limiter.record("retried")
+            self.metrics.inc("lcm_llm_retries_total")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _llm_compress(self, messages: list[Message], style: str, max_tokens: int) -> str:
+        key = self._cache_key(messages, style, max_tokens)
+        if key is not None and (cached := self.cache.get(key)) is not None:
+            return cached
+        payload, tokens = self._build_request(messages, style)
+        resp = await self._post_with_retry(payload, tokens)
+        if self._needs_temperature_retry(resp):
+            payload["temperature"] = 1
+            resp = await self._post_with_retry(payload, tokens)
+        text = self._parse_response(resp, style)
+        if key is not None:
+            self.cache.put(key, text)
+        return text
+
+    async def normal_compress(self, messages: list[Message], target_tokens: int | None = None) -> str:
+        budget = max(80, target_tokens or 220)
+        try:
+            return await self._llm_compress(messages, style="normal", max_tokens=budget)
+        except Exception:
+            return self._normal_truncate(messages)
+
+    async def aggressive_compress(self, messages: list[Message], target_tokens: int | None = None) -> str:
+        budget = max(40, target_tokens or 120)
+        try:
+            return await self._llm_compress(messages, style="aggressive", max_tokens=budget)
+        except Exception:
+            return self._aggressive_bullets(messages)
+
+    async def _run_level(self, level: str, messages: list[Message], target_tokens: int) -> str:
+        if level == "normal":
+            return await self.normal_compress(messages, target_tokens=target_tokens)
+        return await self.aggressive_compress(messages, target_tokens=target_tokens)
+
+    async def compress(self, messages: list[Message], target_tokens: int) -> tuple[str, str]:
+        levels, bucket = self._plan_levels(messages, target_tokens)
+        if self.speculative and len(levels) > 1:
+            texts = await asyncio.gather(*(self._run_level(lvl, messages, target_tokens) for lvl in levels))
+            chosen = None
+            for level, text in zip(levels, texts):
+                if self._accept(level, text, target_tokens, bucket) and chosen is None:
+                    chosen = (level, text)
+            if chosen is not None:
+                self._record_level(chosen[0])
+                return chosen
+        else:
+            for level in levels:
+                text = await self._run_level(level, messages, target_tokens)
+                if self._accept(level, text, target_tokens, bucket):
+                    self._record_level(level)
+                    return level, text
+        return self._fallback_within(messages, target_tokens)
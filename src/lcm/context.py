@@ -1,24 +1,30 @@
 from __future__ import annotations
 
-from concurrent.futures import Future, ThreadPoolExecutor
-from typing import List, Optional
+import asyncio
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from itertools import repeat
+from typing import Deque, List, Optional, Tuple
 
-from .compactor import Compactor
+from .compactor import AsyncCompactor, Compactor
 from .dag import SummaryDAG
+from .metrics import NULL_METRICS, NullMetrics
 from .store import Message
 
 
-class ContextManager:
-    """Maintains active context under soft/hard token budgets."""
+class _ContextManagerBase:
+    """Active-context bookkeeping and compaction planning shared by the sync and asyncio managers."""
 
     def __init__(
         self,
         *,
-        compactor: Compactor,
+        compactor: Compactor | AsyncCompactor,
         dag: SummaryDAG,
         tau_soft: int = 600,
         tau_hard: int = 1000,
         recent_window: int = 6,
+        max_inflight: int = 2,
+        metrics: NullMetrics = NULL_METRICS,
     ):
         if tau_soft >= tau_hard:
             raise ValueError("tau_soft must be smaller than tau_hard")
@@ -27,87 +33,319 @@ class ContextManager:
         self.tau_soft = tau_soft
         self.tau_hard = tau_hard
         self.recent_window = recent_window
+        self.metrics = metrics
 
         self.recent_messages: List[Message] = []
         self.summary_node_ids: List[str] = []
+        # Running totals, updated as messages/summaries enter and leave the active context.
+        # `_recent_token_counts` is aligned with `recent_messages` so each message is counted once.
+        self._recent_token_counts: List[int] = []
+        self._recent_tokens = 0
+        self._summary_tokens = 0
 
-        self._executor = ThreadPoolExecutor(max_workers=1)
-        self._soft_future: Optional[Future] = None
+        # Soft compactions run concurrently but are committed strictly in submission (block) order.
+        self.max_inflight = max_inflight
+        self._pending: Deque[Tuple[Future | asyncio.Future, List[Message]]] = deque()
 
     def _total_tokens(self) -> int:
-        recent_tokens = self.compactor.count_messages_tokens(self.recent_messages)
-        summary_tokens = sum(self.dag.nodes[nid].token_count for nid in self.summary_node_ids if nid in self.dag.nodes)
-        return recent_tokens + summary_tokens
+        return self._recent_tokens + self._summary_tokens
 
-    def _compress_recent_block(self, block: list[Message], target: int) -> str:
-        _level, text = self.compactor.compress(block, target_tokens=target)
-        return text
+    def _push_recent(self, msg: Message) -> None:
+        count = self.compactor.token_counter(msg.content)
+        self.recent_messages.append(msg)
+        self._recent_token_counts.append(count)
+        self._recent_tokens += count
 
-    def _flush_soft_future(self) -> None:
-        if self._soft_future and self._soft_future.done():
-            text, block = self._soft_future.result()
-            node = self.dag.add_summary(block, text)
-            self.summary_node_ids.append(node.id)
-            self._soft_future = None
+    def _take_recent(self, n: int) -> list[Message]:
+        block = self.recent_messages[:n]
+        self._recent_tokens -= sum(self._recent_token_counts[:n])
+        self.recent_messages = self.recent_messages[n:]
+        self._recent_token_counts = self._recent_token_counts[n:]
+        return block
 
-    def add_message(self, msg: Message) -> None:
-        self._flush_soft_future()
-        self.recent_messages.append(msg)
+    def _push_summary(self, node_id: str) -> None:
+        self.summary_node_ids.append(node_id)
+        self._summary_tokens += self.dag.nodes[node_id].token_count
 
-        total = self._total_tokens()
-        if total > self.tau_hard:
-            self._blocking_compress_until_within_hard()
-            return
+    def _replace_summaries(self, count: int, parent_id: str) -> None:
+        removed = self.summary_node_ids[:count]
+        self._summary_tokens -= sum(self.dag.nodes[nid].token_count for nid in removed if nid in self.dag.nodes)
+        self.summary_node_ids = [parent_id] + self.summary_node_ids[count:]
+        self._summary_tokens += self.dag.nodes[parent_id].token_count
 
-        if total > self.tau_soft and self._soft_future is None and len(self.recent_messages) > self.recent_window:
-            block = self.recent_messages[:-self.recent_window]
-            self.recent_messages = self.recent_messages[-self.recent_window:]
-            self._soft_future = self._executor.submit(
-                lambda b=block: (self._compress_recent_block(b, self.tau_soft // 2), b)
-            )
+    def _commit_ready(self) -> None:
+        while self._pending and self._pending[0][0].done():
+            job, block = self._pending.popleft()
+            self._push_summary(self.dag.add_summary(block, job.result()).id)
 
-    def _blocking_compress_until_within_hard(self) -> None:
-        if self._soft_future is not None:
-            text, block = self._soft_future.result()
+    def _plan_hard_step(self) -> Optional[Tuple[List[Message], int, Optional[List[str]]]]:
+        """Take the next blocking compaction off the context: `(block, target, child_ids)` or None."""
+        if len(self.recent_messages) > 1:
+            block_size = max(1, len(self.recent_messages) // 2)
+            return self._take_recent(block_size), self.tau_soft // 2, None
+
+        if len(self.summary_node_ids) >= 2:
+            child_count = max(2, len(self.summary_node_ids) // 2)
+            child_ids = self.summary_node_ids[:child_count]
+            return self._summary_messages(child_ids), max(1, self.tau_soft // 3), child_ids
+
+        return None
+
+    def _summary_messages(self, node_ids: List[str]) -> List[Message]:
+        return [
+            Message(id=nid, timestamp="", role="summary", content=self.dag.nodes[nid].content)
+            for nid in node_ids
+            if nid in self.dag.nodes
+        ]
+
+    def _apply_hard_step(self, block: List[Message], text: str, child_ids: Optional[List[str]]) -> None:
+        if child_ids is None:
             node = self.dag.add_summary(block, text)
-            self.summary_node_ids.append(node.id)
-            self._soft_future = None
-
-        while self._total_tokens() > self.tau_hard:
-            if len(self.recent_messages) > 1:
-                block_size = max(1, len(self.recent_messages) // 2)
-                block = self.recent_messages[:block_size]
-                self.recent_messages = self.recent_messages[block_size:]
-                text = self._compress_recent_block(block, target=self.tau_soft // 2)
-                node = self.dag.add_summary(block, text)
-                self.summary_node_ids.append(node.id)
-                continue
-
-            if len(self.summary_node_ids) >= 2:
-                child_count = max(2, len(self.summary_node_ids) // 2)
-                child_ids = self.summary_node_ids[:child_count]
-                child_messages = [
-                    Message(
-                        id=cid,
-                        timestamp="",
-                        role="summary",
-                        content=self.dag.nodes[cid].content,
-                    )
-                    for cid in child_ids
-                    if cid in self.dag.nodes
-                ]
-                text = self._compress_recent_block(child_messages, target=max(1, self.tau_soft // 3))
-                parent = self.dag.add_summary([], text, child_node_ids=child_ids)
-                self.summary_node_ids = [parent.id] + self.summary_node_ids[child_count:]
-                continue
-
-            break
+            self._push_summary(node.id)
+        else:
+            parent = self.dag.add_summary([], text, child_node_ids=child_ids)
+            self._replace_summaries(len(child_ids), parent.id)
+
+    def _plan_bulk(self, msgs: List[Message], block_tokens: int) -> List[List[Message]]:
+        """Keep a recent tail in context and split everything older into leaf blocks of ~`block_tokens`."""
+        pending = self.recent_messages + msgs
+        counts = self._recent_token_counts + self.compactor.token_counter.count_many([m.content for m in msgs])
+        self.recent_messages, self._recent_token_counts, self._recent_tokens = [], [], 0
+        if self._summary_tokens + sum(counts) <= self.tau_soft:
+            split = 0
+        else:
+            split, tail_tokens = len(pending), 0
+            while split > 0 and len(pending) - split < self.recent_window and tail_tokens + counts[split - 1] <= self.tau_soft:
+                split -= 1
+                tail_tokens += counts[split]
+        for msg, count in zip(pending[split:], counts[split:]):
+            self.recent_messages.append(msg)
+            self._recent_token_counts.append(count)
+            self._recent_tokens += count
+
+        blocks: List[List[Message]] = []
+        block: List[Message] = []
+        size = 0
+        for msg, count in zip(pending[:split], counts[:split]):
+            if block and size + count > block_tokens:
+                blocks.append(block)
+                block, size = [], 0
+            block.append(msg)
+            size += count
+        if block:
+            blocks.append(block)
+        return blocks
+
+    def _plan_bulk_merge(self, fanout: int) -> Optional[List[List[str]]]:
+        """Next level of the bulk tree: consecutive groups of `fanout` summaries, or None once the context fits."""
+        if self._total_tokens() <= self.tau_soft or len(self.summary_node_ids) < 2:
+            return None
+        ids = self.summary_node_ids
+        return [ids[i : i + fanout] for i in range(0, len(ids), fanout)]
+
+    def _apply_bulk_merge(self, groups: List[List[str]], texts: List[Optional[str]]) -> None:
+        merged: List[str] = []
+        for group, text in zip(groups, texts):
+            merged.append(group[0] if text is None else self.dag.add_summary([], text, child_node_ids=group).id)
+        self.summary_node_ids, self._summary_tokens = [], 0
+        for node_id in merged:
+            self._push_summary(node_id)
+
+    def _bulk_jobs(self, groups: List[List[str]]) -> List[Tuple[List[Message], int]]:
+        return [(self._summary_messages(g), max(1, self.tau_soft // 3)) for g in groups if len(g) > 1]
+
+    @staticmethod
+    def _bulk_texts(groups: List[List[str]], compressed: List[str]) -> List[Optional[str]]:
+        # Singleton groups pass through unchanged; the rest consume compressed texts in order.
+        it = iter(compressed)
+        return [next(it) if len(g) > 1 else None for g in groups]
+
+    def export_state(self) -> dict:
+        """Ids of the active context, for checkpointing; call after pending compactions are committed."""
+        if self._pending:
+            raise RuntimeError("export_state() requires no pending compactions; call drain() first")
+        return {
+            "recent_message_ids": [m.id for m in self.recent_messages],
+            "summary_node_ids": list(self.summary_node_ids),
+        }
+
+    def restore_state(self, recent_messages: List[Message], summary_node_ids: List[str]) -> None:
+        self.recent_messages, self._recent_token_counts, self._recent_tokens = [], [], 0
+        self.summary_node_ids, self._summary_tokens = [], 0
+        for msg in recent_messages:
+            self._push_recent(msg)
+        for node_id in summary_node_ids:
+            self._push_summary(node_id)
 
     def get_active_context(self) -> dict:
-        self._flush_soft_future()
+        self._commit_ready()
         summaries = [self.dag.nodes[nid] for nid in self.summary_node_ids if nid in self.dag.nodes]
         return {
             "recent_messages": self.recent_messages,
             "summaries": summaries,
             "token_estimate": self._total_tokens(),
         }
+
+
+class ContextManager(_ContextManagerBase):
+    """Maintains active context under soft/hard token budgets."""
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = 2,
+        max_inflight: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        **kwargs,
+    ):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        super().__init__(max_inflight=max_inflight or max_workers, **kwargs)
+        # An injected executor is shared (e.g. across sessions) and left running on close().
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+
+    def _compress_recent_block(self, block: list[Message], target: int, stage: str = "soft") -> str:
+        with self.metrics.span("lcm_compaction", stage=stage):
+            _level, text = self.compactor.compress(block, target_tokens=target)
+        return text
+
+    def _commit_next(self) -> None:
+        future, block = self._pending.popleft()
+        node = self.dag.add_summary(block, future.result())
+        self._push_summary(node.id)
+
+    def drain(self) -> None:
+        """Wait for in-flight soft compactions and commit them to the DAG and active context."""
+        while self._pending:
+            self._commit_next()
+
+    def add_message(self, msg: Message) -> None:
+        with self.metrics.span("lcm_add_message"):
+            self._add_message(msg)
+
+    def _add_message(self, msg: Message) -> None:
+        self._commit_ready()
+        self._push_recent(msg)
+
+        total = self._total_tokens()
+        if total > self.tau_hard:
+            self._blocking_compress_until_within_hard()
+            return
+
+        if total > self.tau_soft and len(self.recent_messages) > self.recent_window:
+            if len(self._pending) >= self.max_inflight:
+                # Backpressure: wait on the oldest block now rather than stalling later at tau_hard.
+                self._commit_next()
+            block = self._take_recent(len(self.recent_messages) - self.recent_window)
+            future = self._executor.submit(self._compress_recent_block, block, self.tau_soft // 2)
+            self._pending.append((future, block))
+
+    def _blocking_compress_until_within_hard(self) -> None:
+        self.metrics.inc("lcm_hard_stalls_total")
+        with self.metrics.span("lcm_hard_stall"):
+            self.drain()
+
+            while self._total_tokens() > self.tau_hard:
+                step = self._plan_hard_step()
+                if step is None:
+                    break
+                block, target, child_ids = step
+                self._apply_hard_step(block, self._compress_recent_block(block, target, "hard"), child_ids)
+
+    def add_messages(self, msgs: List[Message], *, fanout: int = 4, block_tokens: Optional[int] = None) -> None:
+        """Bulk ingest: leaf blocks are compacted in parallel, then merged `fanout` at a time into a balanced tree."""
+        if fanout < 2:
+            raise ValueError("fanout must be at least 2")
+        self.drain()
+        blocks = self._plan_bulk(msgs, block_tokens or self.tau_soft)
+        texts = list(self._executor.map(self._compress_recent_block, blocks, repeat(self.tau_soft // 2), repeat("bulk")))
+        for block, text in zip(blocks, texts):
+            self._push_summary(self.dag.add_summary(block, text).id)
+
+        while (groups := self._plan_bulk_merge(fanout)) is not None:
+            jobs = self._bulk_jobs(groups)
+            compressed = list(self._executor.map(self._compress_recent_block, *zip(*jobs), ["bulk"] * len(jobs)))
+            self._apply_bulk_merge(groups, self._bulk_texts(groups, compressed))
+
+        if self._total_tokens() > self.tau_hard:
+            self._blocking_compress_until_within_hard()
+
+    def close(self) -> None:
+        self.drain()
+        if self._owns_executor:
+            self._executor.shutdown()
+
+
+class AsyncContextManager(_ContextManagerBase):
+    """ContextManager for asyncio: soft compactions are event-loop tasks instead of worker threads."""
+
+    def __init__(self, *, compactor: AsyncCompactor, dag: SummaryDAG, **kwargs):
+        super().__init__(compactor=compactor, dag=dag, **kwargs)
+
+    async def _compress_recent_block(self, block: list[Message], target: int, stage: str = "soft") -> str:
+        with self.metrics.span("lcm_compaction", stage=stage):
+            _level, text = await self.compactor.compress(block, target_tokens=target)
+        return text
+
+    async def _commit_next(self) -> None:
+        task, block = self._pending.popleft()
+        node = self.dag.add_summary(block, await task)
+        self._push_summary(node.id)
+
+    async def drain(self) -> None:
+        while self._pending:
+            await self._commit_next()
+
+    async def aclose(self) -> None:
+        await self.drain()
+
+    async def add_message(self, msg: Message) -> None:
+        with self.metrics.span("lcm_add_message"):
+            await self._add_message(msg)
+
+    async def _add_message(self, msg: Message) -> None:
+        self._commit_ready()
+        self._push_recent(msg)
+
+        total = self._total_tokens()
+        if total > self.tau_hard:
+            await self._blocking_compress_until_within_hard()
+            return
+
+        if total > self.tau_soft and len(self.recent_messages) > self.recent_window:
+            if len(self._pending) >= self.max_inflight:
+                await self._commit_next()
+            block = self._take_recent(len(self.recent_messages) - self.recent_window)
+            task = asyncio.ensure_future(self._compress_recent_block(block, self.tau_soft // 2))
+            self._pending.append((task, block))
+
+    async def add_messages(self, msgs: List[Message], *, fanout: int = 4, block_tokens: Optional[int] = None) -> None:
+        if fanout < 2:
+            raise ValueError("fanout must be at least 2")
+        await self.drain()
+        blocks = self._plan_bulk(msgs, block_tokens or self.tau_soft)
+        texts = await asyncio.gather(*(self._compress_recent_block(b, self.tau_soft // 2, "bulk") for b in blocks))
+        for block, text in zip(blocks, texts):
+            self._push_summary(self.dag.add_summary(block, text).id)
+
+        while (groups := self._plan_bulk_merge(fanout)) is not None:
+            compressed = await asyncio.gather(
+                *(self._compress_recent_block(b, t, "bulk") for b, t in self._bulk_jobs(groups))
+            )
+            self._apply_bulk_merge(groups, self._bulk_texts(groups, list(compressed)))
+
+        if self._total_tokens() > self.tau_hard:
+            await self._blocking_compress_until_within_hard()
+
+    async def _blocking_compress_until_within_hard(self) -> None:
+        self.metrics.inc("lcm_hard_stalls_total")
+        with self.metrics.span("lcm_hard_stall"):
+            await self.drain()
+
+            while self._total_tokens() > self.tau_hard:
+                step = self._plan_hard_step()
+                if step is None:
+                    break
+                block, target, child_ids = step
+                self._apply_hard_step(block, await self._compress_recent_block(block, target, "hard"), child_ids)
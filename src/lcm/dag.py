@@ -1,15 +1,25 @@
+"""Summary DAG with pointers back to source messages.
+
+Parent, level and message -> covering-node indexes are maintained on insert (`parents`,
+`get_at_level`, `covering`), and an optional append-only journal supports checkpointed restarts.
+"""
+
 from __future__ import annotations
 
 import json
+import os
+from array import array
+from collections.abc import Iterator, Mapping
 from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Dict
+from typing import IO, Dict
 from uuid import uuid4
 
 from .store import Message
+from .tokens import TokenCounter, default_token_counter
 
 
-@dataclass
+@dataclass(slots=True)
 class SummaryNode:
     id: str
     content: str
@@ -18,65 +28,293 @@ class SummaryNode:
     token_count: int = 0
 
 
+class _ExpandedView(Mapping):
+    """Read-only `node_id -> message ids` mapping computed on access."""
+
+    def __init__(self, dag: "SummaryDAG"):
+        self._dag = dag
+
+    def __getitem__(self, node_id: str) -> list[str]:
+        if node_id not in self._dag.nodes:
+            raise KeyError(node_id)
+        return self._dag.expand(node_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._dag.nodes)
+
+    def __len__(self) -> int:
+        return len(self._dag.nodes)
+
+
 class SummaryDAG:
     """Hierarchical summary graph with pointers to original messages."""
 
-    def __init__(self):
+    def __init__(self, *, token_counter: TokenCounter | None = None):
+        self.token_counter = token_counter or default_token_counter()
         self.nodes: Dict[str, SummaryNode] = {}
-        self.node_to_message_ids: Dict[str, list[str]] = {}
+        # Node and message ids are interned to ints. Each node stores only its own child pointers
+        # and (for level-1 nodes) its own leaf message refs, so memory stays linear in messages;
+        # `expand` walks the children instead of reading a per-ancestor copy.
+        self._node_ids: list[str] = []
+        self._node_index: dict[str, int] = {}
+        self._children: list[array] = []
+        self._leaves: list[array] = []
+        # Reverse indexes, all insertion-ordered so queries cost O(result): parent pointers per node,
+        # the parentless nodes, nodes by level, and the level-1 nodes pointing at each message.
+        self._parents: list[array] = []
+        self._roots: dict[int, None] = {}
+        self._levels: dict[int, dict[int, None]] = {}
+        self._message_ids: list[str] = []
+        self._message_index: dict[str, int] = {}
+        self._message_nodes: list[array] = []
+        self.node_to_message_ids: Mapping[str, list[str]] = _ExpandedView(self)
+        # Journaled persistence (see `open`): snapshot at `_snapshot_path`, one JSON line per
+        # node added since that snapshot at `<snapshot>.journal`.
+        self._snapshot_path: Path | None = None
+        self._journal: IO[str] | None = None
+        self._journal_records = 0
+        self.compact_every: int | None = None
 
     @staticmethod
-    def _estimate_tokens(text: str) -> int:
-        return max(1, len(text.split())) if text.strip() else 0
+    def _journal_path(path: Path) -> Path:
+        return path.with_name(path.name + ".journal")
 
     def add_summary(self, messages: list[Message], summary_text: str, *, child_node_ids: list[str] | None = None) -> SummaryNode:
         child_node_ids = child_node_ids or []
         if child_node_ids:
             level = max(self.nodes[c].level for c in child_node_ids) + 1
-            message_ids: list[str] = []
-            for cid in child_node_ids:
-                message_ids.extend(self.node_to_message_ids.get(cid, []))
         else:
             level = 1
-            message_ids = [m.id for m in messages]
 
         node = SummaryNode(
             id=str(uuid4()),
             content=summary_text,
             children_ids=list(child_node_ids),
             level=level,
-            token_count=self._estimate_tokens(summary_text),
+            token_count=self.token_counter(summary_text),
         )
-        self.nodes[node.id] = node
-        self.node_to_message_ids[node.id] = list(dict.fromkeys(message_ids))
+        leaf_ids = [] if child_node_ids else [m.id for m in messages]
+        self._insert(node, leaf_ids)
+        if self._journal is not None:
+            self._journal.write(json.dumps({**asdict(node), "message_ids": leaf_ids}, ensure_ascii=False) + "\n")
+            self._journal.flush()
+            self._journal_records += 1
+            if self.compact_every and self._journal_records >= self.compact_every:
+                self.compact()
         return node
 
+    def _node_slot(self, node_id: str) -> int:
+        slot = self._node_index.get(node_id)
+        if slot is None:
+            slot = len(self._node_ids)
+            self._node_index[node_id] = slot
+            self._node_ids.append(node_id)
+            self._children.append(array("I"))
+            self._leaves.append(array("I"))
+            self._parents.append(array("I"))
+        return slot
+
+    def _message_slot(self, message_id: str) -> int:
+        slot = self._message_index.get(message_id)
+        if slot is None:
+            slot = len(self._message_ids)
+            self._message_index[message_id] = slot
+            self._message_ids.append(message_id)
+            self._message_nodes.append(array("I"))
+        return slot
+
+    def _insert(self, node: SummaryNode, leaf_message_ids: list[str]) -> None:
+        if node.id in self.nodes:
+            return  # replaying a record the snapshot already holds
+        slot = self._node_slot(node.id)
+        if node.children_ids:
+            self._children[slot] = array("I", (self._node_slot(cid) for cid in node.children_ids))
+            for child in self._children[slot]:
+                self._parents[child].append(slot)
+                self._roots.pop(child, None)
+        else:
+            self._leaves[slot] = array("I", (self._message_slot(mid) for mid in leaf_message_ids))
+            for message in self._leaves[slot]:
+                self._message_nodes[message].append(slot)
+        if not self._parents[slot]:
+            self._roots[slot] = None
+        self._levels.setdefault(node.level, {})[slot] = None
+        self.nodes[node.id] = node
+
+    def _expand_slots(self, slot: int) -> list[int]:
+        out: list[int] = []
+        stack = [slot]
+        while stack:
+            current = stack.pop()
+            out.extend(self._leaves[current])
+            stack.extend(reversed(self._children[current]))
+        return list(dict.fromkeys(out))
+
     def expand(self, node_id: str) -> list[str]:
         if node_id not in self.nodes:
             raise KeyError(f"Unknown node_id: {node_id}")
-        return list(self.node_to_message_ids.get(node_id, []))
+        return [self._message_ids[m] for m in self._expand_slots(self._node_index[node_id])]
+
+    def roots(self) -> list[SummaryNode]:
+        """Nodes no other node summarizes, oldest first."""
+        return [self.nodes[self._node_ids[slot]] for slot in self._roots]
+
+    def children(self, node_id: str) -> list[SummaryNode]:
+        return [self.nodes[self._node_ids[c]] for c in self._children[self._node_index[node_id]]]
+
+    def leaf_message_ids(self, node_id: str) -> list[str]:
+        """Message ids a level-1 node points at directly (empty for higher levels)."""
+        return [self._message_ids[m] for m in self._leaves[self._node_index[node_id]]]
+
+    def parents(self, node_id: str) -> list[SummaryNode]:
+        return [self.nodes[self._node_ids[p]] for p in self._parents[self._node_index[node_id]]]
+
+    def covering(self, message_id: str) -> list[SummaryNode]:
+        """Every node whose expansion includes `message_id`: its level-1 nodes, then their ancestors."""
+        message = self._message_index.get(message_id)
+        if message is None:
+            return []
+        seen = dict.fromkeys(self._message_nodes[message])
+        frontier = list(seen)
+        while frontier:
+            nxt = []
+            for slot in frontier:
+                for parent in self._parents[slot]:
+                    if parent not in seen:
+                        seen[parent] = None
+                        nxt.append(parent)
+            frontier = nxt
+        return [self.nodes[self._node_ids[slot]] for slot in seen]
 
     def get_at_level(self, level: int) -> list[SummaryNode]:
-        return [n for n in self.nodes.values() if n.level == level]
+        return [self.nodes[self._node_ids[slot]] for slot in self._levels.get(level, ())]
+
+    @property
+    def depth(self) -> int:
+        """Highest level that currently holds a node (0 when empty)."""
+        return max((level for level, slots in self._levels.items() if slots), default=0)
+
+    def rollback(self, node_count: int) -> None:
+        """Drop every node added after the first `node_count`, newest first."""
+        if node_count >= len(self._node_ids):
+            return
+        while len(self._node_ids) > node_count:
+            slot = len(self._node_ids) - 1
+            node_id = self._node_ids.pop()
+            del self._node_index[node_id]
+            node = self.nodes.pop(node_id, None)
+            if node is not None:
+                self._levels[node.level].pop(slot, None)
+            # This is the newest node, so it is the last entry in every index that references it.
+            for child in self._children.pop():
+                while self._parents[child] and self._parents[child][-1] == slot:
+                    self._parents[child].pop()
+            for message in self._leaves.pop():
+                while self._message_nodes[message] and self._message_nodes[message][-1] == slot:
+                    self._message_nodes[message].pop()
+            self._parents.pop()
+        self._roots = {slot: None for slot in range(len(self._node_ids)) if not self._parents[slot]}
+        if self._journal is not None:
+            self.compact()
 
     def save(self, path: str | Path) -> None:
         p = Path(path)
         p.parent.mkdir(parents=True, exist_ok=True)
         payload = {
-            "nodes": [asdict(n) for n in self.nodes.values()],
-            "node_to_message_ids": self.node_to_message_ids,
+            "version": 2,
+            "message_ids": self._message_ids,
+            "nodes": [{**asdict(n), "leaf": list(self._leaves[self._node_index[n.id]])} for n in self.nodes.values()],
         }
-        p.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp = p.with_name(p.name + ".tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, p)
 
     @classmethod
-    def load(cls, path: str | Path) -> "SummaryDAG":
+    def load(cls, path: str | Path, *, token_counter: TokenCounter | None = None) -> "SummaryDAG":
         p = Path(path)
-        data = json.loads(p.read_text(encoding="utf-8"))
-        dag = cls()
-        for raw in data.get("nodes", []):
-            node = SummaryNode(**raw)
-            dag.nodes[node.id] = node
-        dag.node_to_message_ids = {
-            node_id: list(msg_ids) for node_id, msg_ids in data.get("node_to_message_ids", {}).items()
-        }
+        journal = cls._journal_path(p)
+        dag = cls(token_counter=token_counter)
+        if p.exists() or not journal.exists():
+            data = json.loads(p.read_text(encoding="utf-8"))
+            message_ids = data.get("message_ids", [])
+            legacy = data.get("node_to_message_ids", {})  # version 1: full message-id list per node
+            for raw in data.get("nodes", []):
+                leaf = raw.pop("leaf", None)
+                node = SummaryNode(**raw)
+                if leaf is not None:
+                    dag._insert(node, [message_ids[m] for m in leaf])
+                else:
+                    dag._insert(node, legacy.get(node.id, []))
+        if journal.exists():
+            dag._journal_records = dag._replay(journal)
+        return dag
+
+    def _replay(self, journal: Path) -> int:
+        # Nodes already present in the snapshot (crash between snapshot and journal reset) replay idempotently.
+        lines = journal.read_text(encoding="utf-8").splitlines()
+        applied = 0
+        for i, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                raw = json.loads(line)
+            except ValueError:
+                if i == len(lines) - 1:
+                    break  # torn final record from an interrupted append
+                raise
+            leaf_ids = raw.pop("message_ids", [])
+            self._insert(SummaryNode(**raw), leaf_ids)
+            applied += 1
+        return applied
+
+    @classmethod
+    def open(
+        cls,
+        path: str | Path,
+        *,
+        compact_every: int | None = None,
+        token_counter: TokenCounter | None = None,
+    ) -> "SummaryDAG":
+        """Load snapshot + journal at `path` (if any) and keep journaling every new node."""
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        journal = cls._journal_path(p)
+        if p.exists() or journal.exists():
+            dag = cls.load(p, token_counter=token_counter)
+        else:
+            dag = cls(token_counter=token_counter)
+        dag._snapshot_path = p
+        dag.compact_every = compact_every
+        if journal.exists() and journal.stat().st_size:
+            with journal.open("rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    dag.compact()  # drop the torn tail before appending after it
+        dag._journal = journal.open("a", encoding="utf-8")
         return dag
+
+    def checkpoint(self) -> None:
+        """Make every journaled node durable. Costs O(nodes added since the last checkpoint)."""
+        if self._journal is None:
+            raise RuntimeError("checkpoint() requires a journaled DAG; use SummaryDAG.open()")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def compact(self) -> None:
+        """Fold the journal into a fresh snapshot and start an empty journal."""
+        if self._snapshot_path is None:
+            raise RuntimeError("compact() requires a journaled DAG; use SummaryDAG.open()")
+        self.save(self._snapshot_path)
+        journal = self._journal_path(self._snapshot_path)
+        if self._journal is not None:
+            self._journal.close()
+        with journal.open("w", encoding="utf-8") as f:
+            os.fsync(f.fileno())
+        self._journal = journal.open("a", encoding="utf-8") if self._journal is not None else None
+        self._journal_records = 0
+
+    def close(self) -> None:
+        if self._journal is not None:
+            self.checkpoint()
+            self._journal.close()
+            self._journal = None
@@ -1,35 +1,237 @@
+"""Engines tying the store, summary DAG, context manager and compactor together.
+
+With `checkpoint=True` the DAG is journaled and `checkpoint()`/`close()` record the active context and
+store position, so `bootstrap_from_store()` after a restart replays only the tail. `search` uses the
+store's opt-in lexical index; `retrieve` beam-searches the DAG and reads raw messages only under the
+best level-1 nodes. `AsyncLCMEngine` can share one pooled `httpx.AsyncClient` across conversations.
+"""
+
 from __future__ import annotations
 
+import json
+import os
+from concurrent.futures import Executor
 from pathlib import Path
+from typing import Callable, Iterable
+
+import httpx
 
-from .compactor import Compactor
-from .context import ContextManager
+from .compactor import AsyncCompactor, Compactor
+from .context import AsyncContextManager, ContextManager
 from .dag import SummaryDAG
-from .store import ImmutableStore, Message
+from .metrics import NULL_METRICS, NullMetrics
+from .ratelimit import RateLimiter
+from .retrieval import HierarchicalRetriever
+from .sqlite_store import SQLiteStore
+from .store import ImmutableStore, Message, MessageStore
+from .tokens import default_token_counter
+
+STORE_BACKENDS: dict[str, Callable[..., MessageStore]] = {"jsonl": ImmutableStore, "sqlite": SQLiteStore}
+
+
+def _open_store(path: str | Path, backend: str, **kwargs) -> MessageStore:
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f"backend must be one of {tuple(STORE_BACKENDS)}, got {backend!r}")
+    return STORE_BACKENDS[backend](path, **kwargs)
+
+
+def _record_gauges(metrics: NullMetrics, active: dict, dag: SummaryDAG) -> None:
+    if metrics.enabled:
+        metrics.gauge("lcm_active_tokens", active["token_estimate"])
+        metrics.gauge("lcm_dag_nodes", len(dag.nodes))
+        metrics.gauge("lcm_dag_depth", dag.depth)
 
 
 class LCMEngine:
     """Main loop: ingest message -> store -> context management -> active context."""
 
-    def __init__(self, store_path: str | Path, *, tau_soft: int = 600, tau_hard: int = 1000):
-        self.store = ImmutableStore(store_path)
-        self.dag = SummaryDAG()
-        self.compactor = Compactor()
+    def __init__(
+        self,
+        store_path: str | Path,
+        *,
+        tau_soft: int = 600,
+        tau_hard: int = 1000,
+        compactor: Compactor | None = None,
+        search_index: bool = False,
+        checkpoint: bool = False,
+        dag_compact_every: int | None = 4096,
+        executor: Executor | None = None,
+        metrics: NullMetrics = NULL_METRICS,
+        backend: str = "jsonl",
+    ):
+        # An injected compactor keeps its own `metrics`; pass the same registry to both to see its spans.
+        self.metrics = metrics
+        self.store = _open_store(store_path, backend, search_index=search_index, metrics=metrics)
+        self.tokens = compactor.token_counter if compactor is not None else default_token_counter()
+        # With `checkpoint=True` the DAG is journaled to `<store>.dag` and `checkpoint()` records the
+        # active context plus the store position it covers in `<store>.ckpt`.
+        self.checkpoint_path: Path | None = None
+        if checkpoint:
+            self.checkpoint_path = self.store.path.with_name(self.store.path.name + ".ckpt")
+            dag_path = self.store.path.with_name(self.store.path.name + ".dag")
+            self.dag = SummaryDAG.open(dag_path, compact_every=dag_compact_every, token_counter=self.tokens)
+        else:
+            self.dag = SummaryDAG(token_counter=self.tokens)
+        self._owns_compactor = compactor is None
+        self.compactor = compactor or Compactor(token_counter=self.tokens, metrics=metrics)
         self.context = ContextManager(
             compactor=self.compactor,
             dag=self.dag,
             tau_soft=tau_soft,
             tau_hard=tau_hard,
+            executor=executor,
+            metrics=metrics,
         )
+        self.retriever = HierarchicalRetriever(self.dag, self.store)
+        # Store position up to which messages have been fed to the context.
+        self._applied_position = (0, 0)
+        if self.checkpoint_path is not None:
+            self._restore_checkpoint()
 
     def receive(self, role: str, content: str) -> dict:
-        msg = self.store.append(role=role, content=content)
-        self.context.add_message(msg)
-        return self.context.get_active_context()
+        with self.metrics.span("lcm_receive"):
+            msg = self.store.append(role=role, content=content)
+            self.context.add_message(msg)
+            self._applied_position = self.store.end_position
+            active = self.context.get_active_context()
+        _record_gauges(self.metrics, active, self.dag)
+        return active
+
+    def receive_many(self, records: Iterable[tuple[str, ...]], *, fanout: int = 4) -> dict:
+        """Bulk import `(role, content[, id])` records: one group commit, then a balanced summary tree."""
+        with self.metrics.span("lcm_receive_many"):
+            msgs = self.store.append_many(records)
+            self.context.add_messages(msgs, fanout=fanout)
+            self._applied_position = self.store.end_position
+            active = self.context.get_active_context()
+        _record_gauges(self.metrics, active, self.dag)
+        return active
 
     def bootstrap_from_store(self) -> None:
-        for msg in self.store.all():
+        """Feed stored messages to the context; after a restored checkpoint only the tail is replayed."""
+        for msg in self.store.iter_from(self._applied_position):
             self.context.add_message(msg)
+        self._applied_position = self.store.end_position
+
+    def checkpoint(self) -> None:
+        if self.checkpoint_path is None:
+            raise RuntimeError("checkpoint() requires LCMEngine(..., checkpoint=True)")
+        self.context.drain()
+        self.dag.checkpoint()
+        state = {
+            "version": 1,
+            "position": list(self._applied_position),
+            "dag_nodes": len(self.dag.nodes),
+            **self.context.export_state(),
+        }
+        tmp = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    def _restore_checkpoint(self) -> None:
+        assert self.checkpoint_path is not None
+        try:
+            state = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+            position = tuple(state["position"])
+            recent = self.store.get_by_ids(state["recent_message_ids"])
+            valid = (
+                position <= self.store.end_position
+                and len(recent) == len(state["recent_message_ids"])
+                and state["dag_nodes"] <= len(self.dag.nodes)
+                and all(nid in self.dag.nodes for nid in state["summary_node_ids"])
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            valid = False
+        if not valid:
+            # No usable checkpoint: start over and let `bootstrap_from_store` replay everything.
+            self.dag.rollback(0)
+            return
+        # Nodes journaled after the checkpoint belong to the tail that is about to be replayed.
+        self.dag.rollback(state["dag_nodes"])
+        self.context.restore_state(recent, state["summary_node_ids"])
+        self._applied_position = position
+
+    def close(self) -> None:
+        self.context.close()
+        if self.checkpoint_path is not None:
+            self.checkpoint()
+            self.dag.close()
+        if self._owns_compactor:
+            self.compactor.close()
+        self.store.close()
+
+    def get_message(self, message_id: str) -> Message | None:
+        return self.store.get_by_id(message_id)
+
+    def search(self, query: str, k: int = 10) -> list[Message]:
+        return self.store.search(query, k)
+
+    def retrieve(self, query: str, k: int = 10) -> list[Message]:
+        """Beam descent through the summary DAG; touches only the most promising subtrees."""
+        return self.retriever.retrieve(query, k).messages
+
+
+class AsyncLCMEngine:
+    """asyncio variant of LCMEngine; many engines can share one pooled httpx.AsyncClient and RateLimiter."""
+
+    def __init__(
+        self,
+        store_path: str | Path,
+        *,
+        tau_soft: int = 600,
+        tau_hard: int = 1000,
+        client: httpx.AsyncClient | None = None,
+        rate_limiter: RateLimiter | None = None,
+        search_index: bool = False,
+        metrics: NullMetrics = NULL_METRICS,
+        backend: str = "jsonl",
+    ):
+        self.metrics = metrics
+        self.store = _open_store(store_path, backend, search_index=search_index, metrics=metrics)
+        self.tokens = default_token_counter()
+        self.dag = SummaryDAG(token_counter=self.tokens)
+        self.compactor = AsyncCompactor(
+            token_counter=self.tokens, client=client, rate_limiter=rate_limiter, metrics=metrics
+        )
+        self.context = AsyncContextManager(
+            compactor=self.compactor,
+            dag=self.dag,
+            tau_soft=tau_soft,
+            tau_hard=tau_hard,
+            metrics=metrics,
+        )
+
+    async def receive(self, role: str, content: str) -> dict:
+        # Same order as LCMEngine.receive: the raw message is durable before any compaction sees it.
+        with self.metrics.span("lcm_receive"):
+            msg = self.store.append(role=role, content=content)
+            await self.context.add_message(msg)
+            active = self.context.get_active_context()
+        _record_gauges(self.metrics, active, self.dag)
+        return active
+
+    async def receive_many(self, records: Iterable[tuple[str, ...]], *, fanout: int = 4) -> dict:
+        with self.metrics.span("lcm_receive_many"):
+            msgs = self.store.append_many(records)
+            await self.context.add_messages(msgs, fanout=fanout)
+            active = self.context.get_active_context()
+        _record_gauges(self.metrics, active, self.dag)
+        return active
+
+    async def bootstrap_from_store(self) -> None:
+        for msg in self.store.all():
+            await self.context.add_message(msg)
 
     def get_message(self, message_id: str) -> Message | None:
         return self.store.get_by_id(message_id)
+
+    def search(self, query: str, k: int = 10) -> list[Message]:
+        return self.store.search(query, k)
+
+    async def aclose(self) -> None:
+        await self.context.aclose()
+        await self.compactor.aclose()
+        self.store.close()
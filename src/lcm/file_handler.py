@@ -1,22 +1,93 @@
+"""Large file registration and exploration summaries.
+
+`FileHandler.ingest` streams a file through mmap in line-aligned chunks, summarizes unseen chunks (by
+sha256) in parallel and reduces them into a DAG subtree whose leaves point at `file_id:start-end`
+byte ranges (`read_pointer`). Chunks default to 16 KiB so one summary request stays within the
+compactor's `max_source_tokens`; a denser chunk is summarized in halves first.
+"""
+
 from __future__ import annotations
 
-from dataclasses import dataclass
+import hashlib
+import mmap
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Iterator
 from uuid import uuid4
 
+from .compactor import Compactor
+from .dag import SummaryDAG
+from .operators import llm_map
+from .store import Message
+
 
 @dataclass
 class FileRecord:
     file_id: str
     path: str
     exploration_summary: str
+    size: int = 0
+    sha256: str | None = None
+    root_node_id: str | None = None
+    chunk_node_ids: list[str] = field(default_factory=list)
+
+
+def _chunk_bounds(buf: mmap.mmap, chunk_bytes: int) -> Iterator[tuple[int, int]]:
+    """Byte ranges of about `chunk_bytes`, ending after a newline when one is near, never inside a UTF-8 sequence."""
+    size = len(buf)
+    start = 0
+    while start < size:
+        end = min(size, start + chunk_bytes)
+        if end < size:
+            nl = buf.find(b"\n", end - 1, min(size, end + chunk_bytes // 4))
+            if nl >= 0:
+                end = nl + 1
+            else:
+                while end > start + 1 and buf[end] & 0xC0 == 0x80:
+                    end -= 1
+        yield start, end
+        start = end
 
 
 class FileHandler:
     """Large-file registry with stable file IDs and exploration summaries."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        *,
+        compactor: Compactor | None = None,
+        dag: SummaryDAG | None = None,
+        chunk_bytes: int = 16 * 1024,
+        chunk_target_tokens: int = 300,
+        fanout: int = 8,
+        max_workers: int = 8,
+    ):
+        if fanout < 2:
+            raise ValueError("fanout must be at least 2")
         self._files: dict[str, FileRecord] = {}
+        self._compactor = compactor
+        self._dag = dag
+        self.chunk_bytes = chunk_bytes
+        self.chunk_target_tokens = chunk_target_tokens
+        self.fanout = fanout
+        self.max_workers = max_workers
+        # Chunk summaries by content hash: identical chunks (within or across files) are summarized once.
+        self._chunk_summaries: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.stats: dict[str, int] = {"chunks": 0, "summarized": 0, "deduped": 0}
+
+    @property
+    def compactor(self) -> Compactor:
+        if self._compactor is None:
+            self._compactor = Compactor()
+        return self._compactor
+
+    @property
+    def dag(self) -> SummaryDAG:
+        if self._dag is None:
+            self._dag = SummaryDAG(token_counter=self.compactor.token_counter)
+        return self._dag
 
     def register(self, path: str | Path, exploration_summary: str) -> FileRecord:
         p = Path(path)
@@ -26,3 +97,111 @@ class FileHandler:
 
     def get(self, file_id: str) -> FileRecord | None:
         return self._files.get(file_id)
+
+    def ingest(self, path: str | Path, *, exploration_summary: str | None = None) -> FileRecord:
+        """Chunk `path` through mmap, summarize unseen chunks in parallel and reduce them into a DAG subtree.
+
+        Each level-1 node points at its chunk as `"{file_id}:{start}-{end}"`; `read_pointer` resolves it.
+        """
+        rec = self.register(path, exploration_summary or "")
+        with open(rec.path, "rb") as f:
+            rec.size = f.seek(0, 2)
+            if rec.size == 0:
+                rec.sha256 = hashlib.sha256().hexdigest()
+                return rec
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                chunks = self._summarize_chunks(rec, buf)
+        leaves = [
+            self.dag.add_summary([Message(id=pointer, timestamp="", role="file", content="")], self._chunk_summaries[digest])
+            for pointer, digest in chunks
+        ]
+        rec.chunk_node_ids = [n.id for n in leaves]
+        rec.root_node_id = self._reduce(rec.chunk_node_ids)
+        if exploration_summary is None:
+            rec.exploration_summary = self.dag.nodes[rec.root_node_id].content
+        return rec
+
+    def _summarize_chunks(self, rec: FileRecord, buf: mmap.mmap) -> list[tuple[str, str]]:
+        file_hash = hashlib.sha256()
+        chunks: list[tuple[str, str]] = []
+        view = memoryview(buf)
+
+        def unseen() -> Iterator[tuple[str, int, int]]:
+            # Hashing runs lazily as the pool pulls work, so only the in-flight window is ever decoded.
+            seen: set[str] = set()
+            for start, end in _chunk_bounds(buf, self.chunk_bytes):
+                part = view[start:end]
+                file_hash.update(part)
+                digest = hashlib.sha256(part).hexdigest()
+                chunks.append((f"{rec.file_id}:{start}-{end}", digest))
+                with self._lock:
+                    known = digest in self._chunk_summaries or digest in seen
+                if known:
+                    self.stats["deduped"] += 1
+                    continue
+                seen.add(digest)
+                yield digest, start, end
+
+        def summarize(job: tuple[str, int, int]) -> tuple[str, str]:
+            digest, start, end = job
+            text = bytes(view[start:end]).decode("utf-8", errors="replace")
+            return digest, self._summarize_text(f"{rec.file_id}:{start}-{end}", text)
+
+        try:
+            for digest, summary in llm_map(unseen(), summarize, max_workers=self.max_workers):
+                with self._lock:
+                    self._chunk_summaries[digest] = summary
+                self.stats["summarized"] += 1
+        finally:
+            view.release()
+        self.stats["chunks"] += len(chunks)
+        rec.sha256 = file_hash.hexdigest()
+        return chunks
+
+    def _summarize_text(self, message_id: str, text: str) -> str:
+        """One compress request; text over the compactor's request budget is summarized in halves first."""
+        if len(text) > 1 and self.compactor.token_counter(text) > self.compactor.max_source_tokens:
+            mid = text.rfind("\n", 0, len(text) // 2) + 1 or len(text) // 2
+            text = "\n".join([self._summarize_text(message_id, text[:mid]), self._summarize_text(message_id, text[mid:])])
+        msg = Message(id=message_id, timestamp="", role="file", content=text)
+        _level, summary = self.compactor.compress([msg], target_tokens=self.chunk_target_tokens)
+        return summary
+
+    def _reduce(self, node_ids: list[str]) -> str:
+        level = node_ids
+        while len(level) > 1:
+            groups = [level[i : i + self.fanout] for i in range(0, len(level), self.fanout)]
+
+            def merge(group: list[str]) -> str:
+                msgs = [
+                    Message(id=nid, timestamp="", role="summary", content=self.dag.nodes[nid].content) for nid in group
+                ]
+                _level, text = self.compactor.compress(msgs, target_tokens=self.chunk_target_tokens)
+                return text
+
+            texts = iter(llm_map([g for g in groups if len(g) > 1], merge, max_workers=self.max_workers))
+            # DAG inserts stay on this thread, in file order; a trailing singleton is carried up as-is.
+            level = [
+                group[0] if len(group) == 1 else self.dag.add_summary([], next(texts), child_node_ids=group).id
+                for group in groups
+            ]
+        return level[0]
+
+    def read_range(self, file_id: str, start: int, end: int) -> str:
+        rec = self._files.get(file_id)
+        if rec is None:
+            raise KeyError(f"Unknown file_id: {file_id}")
+        with open(rec.path, "rb") as f:
+            size = f.seek(0, 2)
+            if not 0 <= start <= end <= size:
+                raise ValueError(f"Range {start}-{end} outside {rec.path} ({size} bytes)")
+            if start == end:
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return buf[start:end].decode("utf-8", errors="replace")
+
+    def read_pointer(self, pointer: str) -> str:
+        """Resolve a `"{file_id}:{start}-{end}"` leaf pointer to the original text."""
+        file_id, _, span = pointer.rpartition(":")
+        start, _, end = span.partition("-")
+        return self.read_range(file_id, int(start), int(end))
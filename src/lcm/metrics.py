@@ -0,0 +1,227 @@
+"""Opt-in instrumentation.
+
+`Metrics` records latency histograms (receive, add_message, compaction stages, LLM requests, store I/O),
+gauges for active tokens and DAG size/depth, and fallback / hard-stall counters, with span hooks and
+`to_prometheus()` / `to_json()` snapshots. The default `NullMetrics` makes every hook a no-op.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = tuple[str, tuple[tuple[str, str], ...]]
+
+
+def _key(name: str, labels: dict[str, Any]) -> LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _NullSpan:
+    def label(self, **labels: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullMetrics:
+    """Disabled instrumentation: every hook is a no-op, so call sites stay cheap."""
+
+    enabled = False
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        pass
+
+    def gauge(self, name: str, value: float, **labels: Any) -> None:
+        pass
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        pass
+
+    def span(self, name: str, **labels: Any) -> Any:
+        return _NULL_SPAN
+
+
+NULL_METRICS = NullMetrics()
+
+
+@dataclass
+class Span:
+    """A timed region; its duration lands in the `<name>_seconds` histogram when it closes."""
+
+    name: str
+    labels: dict[str, Any]
+    metrics: "Metrics"
+    parent: "Span | None" = None
+    start: float = 0.0
+    duration: float = 0.0
+    error: BaseException | None = None
+    _token: Any = field(default=None, repr=False)
+
+    def label(self, **labels: Any) -> None:
+        self.labels.update(labels)
+
+    def __enter__(self) -> "Span":
+        self.parent = _current_span.get()
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        self.error = exc
+        self.metrics.observe(f"{self.name}_seconds", self.duration, **self.labels)
+        for hook in self.metrics.span_hooks:
+            hook(self)
+
+
+_current_span: ContextVar[Span | None] = ContextVar("lcm_current_span", default=None)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the `q` quantile (the last finite bound for overflow)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class Metrics(NullMetrics):
+    """In-process registry of counters, gauges, latency histograms and spans, with snapshot exporters."""
+
+    enabled = True
+
+    def __init__(self, *, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.span_hooks: list[Callable[[Span], None]] = []
+        self._lock = threading.Lock()
+        self._counters: dict[LabelKey, float] = {}
+        self._gauges: dict[LabelKey, float] = {}
+        self._histograms: dict[LabelKey, _Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    def span(self, name: str, **labels: Any) -> Span:
+        return Span(name, labels, self)
+
+    def add_span_hook(self, hook: Callable[[Span], None]) -> None:
+        self.span_hooks.append(hook)
+
+    def histogram(self, name: str, **labels: Any) -> dict[str, float]:
+        with self._lock:
+            hist = self._histograms.get(_key(name, labels))
+            if hist is None:
+                return {"count": 0, "sum": 0.0, "p50": 0.0, "p99": 0.0}
+            return {"count": hist.count, "sum": hist.sum, "p50": hist.quantile(0.5), "p99": hist.quantile(0.99)}
+
+    def total(self, name: str) -> float:
+        """Sum of a counter, or of a histogram's observations, across all label sets."""
+        with self._lock:
+            return sum(v for (n, _), v in self._counters.items() if n == name) + sum(
+                h.sum for (n, _), h in self._histograms.items() if n == name
+            )
+
+    def snapshot(self) -> dict[str, list[dict[str, Any]]]:
+        with self._lock:
+            return {
+                "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self._counters.items())],
+                "gauges": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self._gauges.items())],
+                "histograms": [
+                    {
+                        "name": n,
+                        "labels": dict(l),
+                        "count": h.count,
+                        "sum": h.sum,
+                        "p50": h.quantile(0.5),
+                        "p99": h.quantile(0.99),
+                        "buckets": dict(zip([*map(str, h.buckets), "+Inf"], h.counts)),
+                    }
+                    for (n, l), h in sorted(self._histograms.items())
+                ],
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), ensure_ascii=False)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (0.0.4) of the current values."""
+
+        def fmt(labels: tuple[tuple[str, str], ...], extra: tuple[tuple[str, str], ...] = ()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ""
+            escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines: list[str] = []
+        typed: set[str] = set()
+
+        def header(name: str, kind: str) -> None:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                header(name, "counter")
+                lines.append(f"{name}{fmt(labels)} {value:g}")
+            for (name, labels), value in sorted(self._gauges.items()):
+                header(name, "gauge")
+                lines.append(f"{name}{fmt(labels)} {value:g}")
+            for (name, labels), hist in sorted(self._histograms.items()):
+                header(name, "histogram")
+                cumulative = 0
+                for bound, n in zip([*map(str, hist.buckets), "+Inf"], hist.counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{fmt(labels, (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{fmt(labels)} {hist.sum:g}")
+                lines.append(f"{name}_count{fmt(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
@@ -1,24 +1,228 @@
+"""`llm_map` / `agentic_map` style operators.
+
+They run on a bounded pool with ordered results, per-item timeouts and opt-in retries, report failures
+in `.errors`, and `iter_map` streams results for large inputs; `amap` is the asyncio variant.
+"""
+
 from __future__ import annotations
 
-from collections.abc import Callable, Iterable
-from typing import TypeVar
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from contextlib import closing
+from dataclasses import dataclass, field
+from typing import Any, Generic, TypeVar
 
 T = TypeVar("T")
 U = TypeVar("U")
 
 
-def llm_map(items: Iterable[T], fn: Callable[[T], U]) -> list[U]:
-    """Map-style operator intended for deterministic LLM transforms in prototype."""
-    return [fn(x) for x in items]
+@dataclass
+class MapItemError:
+    """An item that still failed after its last attempt."""
+
+    index: int
+    item: Any
+    error: BaseException
+    attempts: int
+
+
+class MapResult(list, Generic[U]):
+    """Successful results in input order; `indices` gives each one's input position, `errors` the failures."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.indices: list[int] = []
+        self.errors: list[MapItemError] = []
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+@dataclass
+class _Task:
+    index: int
+    item: Any
+    attempts: int = 0
+    future: Future | None = None
+    started: float | None = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def _retry_delay(base: float, attempt: int) -> float:
+    return random.uniform(0, base * (2 ** (attempt - 1))) if base > 0 else 0.0
+
+
+def iter_map(
+    items: Iterable[T],
+    fn: Callable[[T], U],
+    *,
+    max_workers: int = 8,
+    timeout: float | None = None,
+    retries: int = 0,
+    retry_delay: float = 0.5,
+    executor: Executor | None = None,
+) -> Iterator[U | MapItemError]:
+    """Stream `fn(item)` results in input order from a bounded pool; a failed item yields a `MapItemError`.
 
+    At most `2 * max_workers` items are in flight, so `items` may be a large lazy iterable. `timeout`
+    counts from when an attempt starts running; a timed-out call cannot be interrupted and keeps its
+    worker until it returns, but its result is discarded.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    pool = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lcm-map")
+    window = 2 * max_workers
+    pending: deque[_Task] = deque()
+    source = enumerate(items)
 
-def agentic_map(items: Iterable[T], fn: Callable[[T], U], *, stop_on_error: bool = False) -> list[U]:
-    """Agentic mapping with optional fail-fast behavior."""
-    out: list[U] = []
-    for item in items:
-        try:
-            out.append(fn(item))
-        except Exception:
+    def run(task: _Task, delay: float) -> U:
+        if delay:
+            time.sleep(delay)
+        with task.lock:
+            task.started = time.monotonic()
+        return fn(task.item)
+
+    def submit(task: _Task, delay: float = 0.0) -> None:
+        task.attempts += 1
+        with task.lock:
+            task.started = None
+        task.future = pool.submit(run, task, delay)
+
+    def result(task: _Task) -> U:
+        assert task.future is not None
+        while timeout is not None and not task.future.done():
+            with task.lock:
+                started = task.started
+            remaining = timeout if started is None else started + timeout - time.monotonic()
+            if started is not None and remaining <= 0:
+                task.future.cancel()
+                raise TimeoutError(f"item {task.index} timed out after {timeout}s")
+            wait([task.future], timeout=remaining)
+        return task.future.result()
+
+    try:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < window:
+                nxt = next(source, None)
+                if nxt is None:
+                    exhausted = True
+                    break
+                task = _Task(*nxt)
+                submit(task)
+                pending.append(task)
+            if not pending:
+                return
+            task = pending[0]
+            try:
+                value = result(task)
+            except Exception as exc:
+                if task.attempts <= retries:
+                    submit(task, _retry_delay(retry_delay, task.attempts))
+                    continue
+                pending.popleft()
+                yield MapItemError(task.index, task.item, exc, task.attempts)
+                continue
+            pending.popleft()
+            yield value
+    finally:
+        for task in pending:
+            if task.future is not None:
+                task.future.cancel()
+        if executor is None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _collect(outputs: Iterable[U | MapItemError], stop_on_error: bool) -> MapResult[U]:
+    result: MapResult[U] = MapResult()
+    for index, out in enumerate(outputs):
+        if isinstance(out, MapItemError):
             if stop_on_error:
-                raise
-    return out
+                raise out.error
+            result.errors.append(out)
+        else:
+            result.append(out)
+            result.indices.append(index)
+    return result
+
+
+def llm_map(
+    items: Iterable[T],
+    fn: Callable[[T], U],
+    *,
+    max_workers: int = 8,
+    timeout: float | None = None,
+    retries: int = 0,
+    retry_delay: float = 0.5,
+    stop_on_error: bool = True,
+    executor: Executor | None = None,
+) -> MapResult[U]:
+    """Map-style operator for LLM transforms: ordered results from a bounded worker pool."""
+    outputs = iter_map(
+        items, fn, max_workers=max_workers, timeout=timeout, retries=retries, retry_delay=retry_delay, executor=executor
+    )
+    with closing(outputs):
+        return _collect(outputs, stop_on_error)
+
+
+def agentic_map(
+    items: Iterable[T],
+    fn: Callable[[T], U],
+    *,
+    stop_on_error: bool = False,
+    max_workers: int = 8,
+    timeout: float | None = None,
+    retries: int = 0,
+    retry_delay: float = 0.5,
+    executor: Executor | None = None,
+) -> MapResult[U]:
+    """Agentic mapping: failures are reported in `.errors` unless `stop_on_error`; opt into `retries`
+    only for idempotent `fn`, since a timed-out attempt may still be running when it is retried."""
+    outputs = iter_map(
+        items, fn, max_workers=max_workers, timeout=timeout, retries=retries, retry_delay=retry_delay, executor=executor
+    )
+    with closing(outputs):
+        return _collect(outputs, stop_on_error)
+
+
+async def amap(
+    items: Iterable[T],
+    fn: Callable[[T], Awaitable[U]],
+    *,
+    concurrency: int = 8,
+    timeout: float | None = None,
+    retries: int = 0,
+    retry_delay: float = 0.5,
+    stop_on_error: bool = False,
+) -> MapResult[U]:
+    """asyncio `agentic_map`: at most `concurrency` coroutines run at once; timeouts cancel the attempt."""
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, item: T) -> U | MapItemError:
+        attempt = 0
+        while True:
+            attempt += 1
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(fn(item), timeout)
+                except Exception as exc:
+                    error = exc
+            if attempt > retries:
+                return MapItemError(index, item, error, attempt)
+            await asyncio.sleep(_retry_delay(retry_delay, attempt))
+
+    tasks = [asyncio.ensure_future(run(i, item)) for i, item in enumerate(items)]
+    try:
+        outputs = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return _collect(outputs, stop_on_error)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Iterator
+
+RETRYABLE_STATUS = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+
+class RateLimiter:
+    """Token-bucket limiter (requests/sec, tokens/min, concurrency) with jittered retry backoff."""
+
+    def __init__(
+        self,
+        *,
+        requests_per_sec: float | None = None,
+        tokens_per_min: float | None = None,
+        max_concurrency: int | None = None,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        retry_statuses: frozenset[int] = RETRYABLE_STATUS,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.requests_per_sec = requests_per_sec
+        self.tokens_per_min = tokens_per_min
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = retry_statuses
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._async_semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        # Bucket levels may go negative: a reservation is taken immediately and the caller sleeps off the debt.
+        now = clock()
+        self._request_level = float(max(1.0, requests_per_sec or 0.0))
+        self._token_level = float(tokens_per_min or 0.0)
+        self._updated = now
+        self.stats: dict[str, int] = {"requests": 0, "throttled": 0, "retried": 0, "failed": 0}
+
+    def record(self, counter: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[counter] += n
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = self._clock()
+            elapsed = now - self._updated
+            self._updated = now
+            wait = 0.0
+            if self.requests_per_sec:
+                capacity = max(1.0, self.requests_per_sec)
+                self._request_level = min(capacity, self._request_level + elapsed * self.requests_per_sec)
+                self._request_level -= 1
+                if self._request_level < 0:
+                    wait = max(wait, -self._request_level / self.requests_per_sec)
+            if self.tokens_per_min and tokens:
+                rate = self.tokens_per_min / 60
+                self._token_level = min(self.tokens_per_min, self._token_level + elapsed * rate)
+                self._token_level -= min(tokens, self.tokens_per_min)
+                if self._token_level < 0:
+                    wait = max(wait, -self._token_level / rate)
+            self.stats["requests"] += 1
+            if wait > 0:
+                self.stats["throttled"] += 1
+            return wait
+
+    @contextmanager
+    def slot(self, tokens: int = 0) -> Iterator[None]:
+        """Hold one concurrency slot and pay for one request plus `tokens` before the body runs."""
+        if self._semaphore is not None and not self._semaphore.acquire(blocking=False):
+            self.record("throttled")
+            self._semaphore.acquire()
+        try:
+            wait = self._reserve(tokens)
+            if wait > 0:
+                self._sleep(wait)
+            yield
+        finally:
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+    @asynccontextmanager
+    async def aslot(self, tokens: int = 0) -> AsyncIterator[None]:
+        """Async `slot`: waits on the event loop instead of blocking a thread."""
+        semaphore = self._async_semaphore
+        if semaphore is not None:
+            if semaphore.locked():
+                self.record("throttled")
+            await semaphore.acquire()
+        try:
+            wait = self._reserve(tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            yield
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """Full-jitter exponential delay for retry `attempt` (0-based), never shorter than `retry_after`."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2**attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(self.max_delay, retry_after))
+        return delay
+
+    def sleep(self, seconds: float) -> None:
+        self._sleep(seconds)
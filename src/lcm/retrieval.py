@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable
+
+from .dag import SummaryDAG, SummaryNode
+from .search import tokenize
+from .store import Message, MessageStore
+
+Scorer = Callable[[str, list[str]], list[float]]
+
+
+def lexical_scores(query: str, texts: list[str], *, k1: float = 1.2, b: float = 0.75) -> list[float]:
+    """BM25 of `query` against each text, using the batch itself as the corpus."""
+    terms = set(tokenize(query))
+    docs = [Counter(tokenize(t)) for t in texts]
+    if not terms or not docs:
+        return [0.0] * len(texts)
+    lengths = [sum(d.values()) for d in docs]
+    avg_length = sum(lengths) / len(docs) or 1.0
+    idf = {}
+    for term in terms:
+        df = sum(1 for d in docs if term in d)
+        idf[term] = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+    scores = []
+    for doc, length in zip(docs, lengths):
+        score = 0.0
+        for term in terms:
+            tf = doc.get(term, 0)
+            if tf:
+                score += idf[term] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+        scores.append(score)
+    return scores
+
+
+@dataclass
+class RetrievalResult:
+    messages: list[Message]
+    scores: list[float]
+    path: list[str] = field(default_factory=list)
+    nodes_scored: int = 0
+    messages_scored: int = 0
+
+
+class HierarchicalRetriever:
+    """Coarse-to-fine search: score DAG roots, descend a beam of the best children, read raw messages at the leaves."""
+
+    def __init__(
+        self,
+        dag: SummaryDAG,
+        store: MessageStore,
+        *,
+        beam_width: int = 4,
+        parent_weight: float = 0.5,
+        scorer: Scorer | None = None,
+    ):
+        if beam_width < 1:
+            raise ValueError("beam_width must be at least 1")
+        self.dag = dag
+        self.store = store
+        self.beam_width = beam_width
+        # A child inherits this share of its parent's score, so a good subtree survives a terse child summary.
+        self.parent_weight = parent_weight
+        self.scorer = scorer or lexical_scores
+
+    def _score_nodes(self, query: str, nodes: list[SummaryNode], inherited: list[float]) -> list[tuple[float, SummaryNode]]:
+        own = self.scorer(query, [n.content for n in nodes])
+        return [(s + self.parent_weight * p, n) for s, p, n in zip(own, inherited, nodes)]
+
+    def _top(self, scored: list[tuple[float, SummaryNode]]) -> list[tuple[float, SummaryNode]]:
+        scored = [item for item in scored if item[0] > 0]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[: self.beam_width]
+
+    def retrieve(self, query: str, k: int = 10) -> RetrievalResult:
+        roots = self.dag.roots()
+        beam = self._top(self._score_nodes(query, roots, [0.0] * len(roots)))
+        result = RetrievalResult(messages=[], scores=[], nodes_scored=len(roots))
+        result.path.extend(node.id for _, node in beam)
+
+        # Each round replaces every internal beam node by its children; level-1 nodes carry over.
+        while any(node.children_ids for _, node in beam):
+            candidates: list[tuple[float, SummaryNode]] = []
+            for score, node in beam:
+                if not node.children_ids:
+                    candidates.append((score, node))
+                    continue
+                children = self.dag.children(node.id)
+                candidates.extend(self._score_nodes(query, children, [score] * len(children)))
+                result.nodes_scored += len(children)
+            beam = self._top(candidates)
+            result.path.extend(node.id for _, node in beam)
+
+        inherited: dict[str, float] = {}
+        for score, node in beam:
+            for mid in self.dag.leaf_message_ids(node.id):
+                inherited.setdefault(mid, score)
+        messages = self.store.get_by_ids(list(inherited))
+        result.messages_scored = len(messages)
+        own = self.scorer(query, [m.content for m in messages])
+        ranked = sorted(
+            ((s + self.parent_weight * inherited[m.id], m) for s, m in zip(own, messages) if s > 0),
+            key=lambda item: item[0],
+            reverse=True,
+        )[:k]
+        result.messages = [m for _, m in ranked]
+        result.scores = [s for s, _ in ranked]
+        return result
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import IO, Iterable
+
+# Unicode word runs, with CJK ideographs split out of them into runs of their own.
+_TOKEN_RE = re.compile(r"[㐀-鿿]+|[^\W㐀-鿿]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased Unicode word tokens; CJK runs (no spaces to split on) become overlapping character bigrams."""
+    out: list[str] = []
+    for run in _TOKEN_RE.findall(text.lower()):
+        if run[0] >= "㐀":
+            out.extend([run] if len(run) == 1 else [run[i : i + 2] for i in range(len(run) - 1)])
+        else:
+            out.append(run)
+    return out
+
+
+def _by_score(item: tuple[int, float]) -> tuple[float, int]:
+    # Highest score first; ties go to the older document.
+    return item[1], -item[0]
+
+
+class BM25Index:
+    """Incrementally maintained inverted index with BM25 ranking, persisted as an append-only sidecar."""
+
+    def __init__(self, path: str | Path, *, k1: float = 1.2, b: float = 0.75):
+        self.path = Path(path)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._writer: IO[str] | None = None
+        self._reset()
+        if not self._read_sidecar():
+            self.clear()
+
+    def _reset(self) -> None:
+        # Documents are numbered in append order; postings hold parallel (doc, term frequency) arrays.
+        self._ids: list[str] = []
+        self._lengths = array("I")
+        self._total_length = 0
+        self._postings: dict[str, tuple[array, array]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def last_id(self) -> str | None:
+        return self._ids[-1] if self._ids else None
+
+    def _add(self, message_id: str, length: int, terms: dict[str, int]) -> None:
+        doc = len(self._ids)
+        self._ids.append(message_id)
+        self._lengths.append(length)
+        self._total_length += length
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("I"))
+            postings[0].append(doc)
+            postings[1].append(tf)
+
+    def _read_sidecar(self) -> bool:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._add(*json.loads(line))
+        except (OSError, ValueError, TypeError):
+            return False
+        return True
+
+    def add_many(self, docs: Iterable[tuple[str, str]]) -> None:
+        """Index `(message_id, content)` pairs in store order."""
+        lines: list[str] = []
+        with self._lock:
+            for message_id, content in docs:
+                tokens = tokenize(content)
+                terms = dict(Counter(tokens))
+                self._add(message_id, len(tokens), terms)
+                lines.append(json.dumps([message_id, len(tokens), terms], ensure_ascii=False) + "\n")
+            if not lines:
+                return
+            if self._writer is None:
+                self._writer = self.path.open("a", encoding="utf-8")
+            self._writer.write("".join(lines))
+            self._writer.flush()
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self._reset()
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text("", encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def search(self, query: str, k: int = 10) -> list[tuple[str, float]]:
+        """Top-`k` `(message_id, score)` pairs; only postings of the query terms are visited."""
+        with self._lock:
+            n = len(self._ids)
+            if n == 0 or k <= 0:
+                return []
+            avg_length = self._total_length / n or 1.0
+            scores: dict[int, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                docs, tfs = postings
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                base = self.k1 * (1 - self.b)
+                scale = self.k1 * self.b / avg_length
+                for doc, tf in zip(docs, tfs):
+                    denom = tf + base + scale * self._lengths[doc]
+                    scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / denom
+            ranked = self._unique(heapq.nlargest(k, scores.items(), key=_by_score), k)
+            if len(ranked) < min(k, len(scores)):
+                # Re-appended ids collapsed some hits; fall back to a full ordering.
+                ranked = self._unique(sorted(scores.items(), key=_by_score, reverse=True), k)
+            return ranked
+
+    def _unique(self, hits: Iterable[tuple[int, float]], k: int) -> list[tuple[str, float]]:
+        ranked: list[tuple[str, float]] = []
+        seen: set[str] = set()
+        for doc, score in hits:
+            mid = self._ids[doc]
+            if mid not in seen:
+                seen.add(mid)
+                ranked.append((mid, score))
+                if len(ranked) == k:
+                    break
+        return ranked
+
+    def close(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
@@ -0,0 +1,211 @@
+"""Many conversations in one process.
+
+Sessions share a compactor (HTTP pool, rate limiter, token counter) and a compaction worker pool;
+idle or least-recently-used sessions are closed to their checkpoint and reload on their next `receive`.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from .compactor import Compactor
+from .engine import LCMEngine
+
+_SESSION_ID_RE = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}")
+
+
+@dataclass
+class _Session:
+    last_used: float
+    engine: LCMEngine | None = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    closed: bool = False
+    # Set once `engine` is loaded (or loading failed with `error`), and once the session is fully closed.
+    ready: threading.Event = field(default_factory=threading.Event)
+    done: threading.Event = field(default_factory=threading.Event)
+    error: BaseException | None = None
+
+
+class SessionManager:
+    """Hosts many conversations over one compactor (HTTP pool, rate limiter, token counter) and one worker pool."""
+
+    def __init__(
+        self,
+        root: str | Path,
+        *,
+        tau_soft: int = 600,
+        tau_hard: int = 1000,
+        max_sessions: int = 256,
+        idle_timeout: float | None = None,
+        max_workers: int = 8,
+        compactor: Compactor | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.tau_soft = tau_soft
+        self.tau_hard = tau_hard
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._clock = clock
+        self._owns_compactor = compactor is None
+        self.compactor = compactor or Compactor()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lcm-compact")
+        # Hot sessions, least recently used first. `_lock` only guards this bookkeeping: loads and
+        # closes run outside it, and a reload waits for the same session's close in `_closing`, so a
+        # session's files are never opened by two engines at once.
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+        self._closing: dict[str, _Session] = {}
+        self._lock = threading.Lock()
+        self.stats: dict[str, int] = {"hits": 0, "loads": 0, "evictions": 0}
+
+    def session_path(self, session_id: str) -> Path:
+        if not _SESSION_ID_RE.fullmatch(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return self.root / session_id / "store.jsonl"
+
+    def _load(self, session_id: str) -> LCMEngine:
+        engine = LCMEngine(
+            self.session_path(session_id),
+            tau_soft=self.tau_soft,
+            tau_hard=self.tau_hard,
+            compactor=self.compactor,
+            checkpoint=True,
+            executor=self.executor,
+        )
+        engine.bootstrap_from_store()
+        return engine
+
+    def _close(self, session_id: str, session: _Session) -> None:
+        session.ready.wait()
+        try:
+            with session.lock:
+                if session.engine is not None:
+                    session.engine.close()
+                session.closed = True
+        finally:
+            with self._lock:
+                if self._closing.get(session_id) is session:
+                    del self._closing[session_id]
+            session.done.set()
+
+    def _close_all(self, victims: list[tuple[str, _Session]]) -> None:
+        for session_id, session in victims:
+            self._close(session_id, session)
+
+    def _acquire(self, session_id: str) -> _Session:
+        self.session_path(session_id)
+        with self._lock:
+            now = self._clock()
+            session = self._sessions.get(session_id)
+            loading, previous = session is None, None
+            if session is None:
+                session = _Session(now)
+                self._sessions[session_id] = session
+                previous = self._closing.get(session_id)
+                self.stats["loads"] += 1
+            else:
+                self.stats["hits"] += 1
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+            victims = self._pop_victims_locked(now, keep=session_id)
+        self._close_all(victims)
+
+        if loading:
+            try:
+                if previous is not None:
+                    previous.done.wait()
+                session.engine = self._load(session_id)
+            except BaseException as exc:
+                session.error = exc
+                with self._lock:
+                    if self._sessions.get(session_id) is session:
+                        del self._sessions[session_id]
+                raise
+            finally:
+                session.ready.set()
+        else:
+            session.ready.wait()
+            if session.error is not None:
+                raise session.error
+        return session
+
+    def _pop_victims_locked(self, now: float, keep: str | None = None) -> list[tuple[str, _Session]]:
+        victims = []
+        while self._sessions:
+            victim_id, victim = next(iter(self._sessions.items()))
+            over_capacity = len(self._sessions) > self.max_sessions
+            idle = self.idle_timeout is not None and now - victim.last_used > self.idle_timeout
+            if not (over_capacity or idle) or victim_id == keep:
+                break
+            victims.append(self._pop_locked(victim_id))
+        return victims
+
+    def _pop_locked(self, session_id: str) -> tuple[str, _Session]:
+        session = self._sessions.pop(session_id)
+        self._closing[session_id] = session
+        self.stats["evictions"] += 1
+        return session_id, session
+
+    def get(self, session_id: str) -> LCMEngine:
+        """The live engine for `session_id`, loading it from its checkpoint if needed; later evictions close it."""
+        engine = self._acquire(session_id).engine
+        assert engine is not None
+        return engine
+
+    def receive(self, session_id: str, role: str, content: str) -> dict:
+        while True:
+            session = self._acquire(session_id)
+            with session.lock:
+                # Evicted between lookup and lock: reload and retry.
+                if not session.closed:
+                    assert session.engine is not None
+                    return session.engine.receive(role, content)
+
+    def evict(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id not in self._sessions:
+                return False
+            victim = self._pop_locked(session_id)
+        self._close_all([victim])
+        return True
+
+    def evict_idle(self) -> None:
+        with self._lock:
+            victims = self._pop_victims_locked(self._clock())
+        self._close_all(victims)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def close(self) -> None:
+        with self._lock:
+            # Closes already running on other threads must finish before the shared pool goes away.
+            pending = list(self._closing.values())
+            victims = list(self._sessions.items())
+            self._sessions.clear()
+            self._closing.update(victims)
+        self._close_all(victims)
+        for session in pending:
+            session.done.wait()
+        self.executor.shutdown()
+        if self._owns_compactor:
+            self.compactor.close()
+
+    def __enter__(self) -> "SessionManager":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
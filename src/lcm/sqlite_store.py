@@ -0,0 +1,230 @@
+"""SQLite backend for the `MessageStore` contract.
+
+WAL mode with one writer connection and a connection per reading thread, append-only triggers,
+indexes on id and timestamp, and an FTS5 table for `search` when `search_index=True`. The FTS table
+indexes the terms of `search.tokenize`, so both backends match the same words and CJK bigrams.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+from uuid import uuid4
+
+from .metrics import NULL_METRICS, NullMetrics
+from .search import tokenize
+from .store import Message
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    timestamp TEXT NOT NULL,
+    ts_us INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_ts ON messages(ts_us);
+CREATE TRIGGER IF NOT EXISTS messages_no_update BEFORE UPDATE ON messages
+BEGIN SELECT RAISE(ABORT, 'messages are append-only'); END;
+CREATE TRIGGER IF NOT EXISTS messages_no_delete BEFORE DELETE ON messages
+BEGIN SELECT RAISE(ABORT, 'messages are append-only'); END;
+"""
+
+# Contentless: the table holds `lcm_terms(content)`, space-separated tokens that FTS5 only splits on
+# the spaces, instead of running its own tokenizer over the raw text.
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    terms, content='', tokenize='unicode61 remove_diacritics 0'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages
+BEGIN INSERT INTO messages_fts(rowid, terms) VALUES (new.seq, lcm_terms(new.content)); END;
+"""
+
+_COLUMNS = "id, timestamp, role, content"
+# Stay under SQLITE_MAX_VARIABLE_NUMBER on older builds.
+_MAX_PARAMS = 500
+
+
+def _epoch_us(ts: datetime) -> int:
+    delta = ts.astimezone(timezone.utc) - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _fts_terms(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+def _fts_query(query: str) -> str:
+    # Quoted terms OR-ed together, so user text never reaches FTS5 query syntax.
+    return " OR ".join(f'"{term}"' for term in dict.fromkeys(tokenize(query)))
+
+
+class SQLiteStore:
+    """Append-only message store backed by SQLite in WAL mode, with an optional FTS5 index."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        search_index: bool = False,
+        synchronous: str = "NORMAL",
+        readonly: bool = False,
+        metrics: NullMetrics = NULL_METRICS,
+    ):
+        if synchronous.upper() not in SYNCHRONOUS_MODES:
+            raise ValueError(f"synchronous must be one of {SYNCHRONOUS_MODES}, got {synchronous!r}")
+        self.path = Path(path)
+        self.synchronous = synchronous.upper()
+        self.readonly = readonly
+        self.metrics = metrics
+        if not readonly:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # One writer connection serialized by `_write_lock`; each reading thread gets its own
+        # connection, so WAL lets reads proceed while a batch is being written.
+        self._write_lock = threading.Lock()
+        self._readers_lock = threading.Lock()
+        self._readers: list[sqlite3.Connection] = []
+        self._local = threading.local()
+        self._conn = self._connect()
+        if not readonly:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        self.search_index = search_index and self._enable_fts()
+        self._last_seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM messages").fetchone()[0]
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.readonly:
+            conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            # The FTS insert trigger calls this, even when this instance did not ask for search.
+            conn.create_function("lcm_terms", 1, _fts_terms, deterministic=True)
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def _enable_fts(self) -> bool:
+        """Create (and backfill) the FTS5 table; False when this SQLite build lacks FTS5."""
+        exists = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'").fetchone()
+        if exists or self.readonly:
+            return exists is not None
+        try:
+            with self._conn:
+                self._conn.executescript(_FTS_SCHEMA)
+                self._conn.execute(
+                    "INSERT INTO messages_fts(rowid, terms) SELECT seq, lcm_terms(content) FROM messages"
+                )
+        except sqlite3.OperationalError:
+            return False
+        return True
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def append(self, role: str, content: str, *, message_id: str | None = None) -> Message:
+        return self.append_many([(role, content, message_id)])[0]
+
+    def append_many(self, records: Iterable[tuple[str, ...]]) -> list[Message]:
+        """Append `(role, content)` or `(role, content, message_id)` records in one transaction."""
+        records = list(records)
+        if not records:
+            return []
+        with self.metrics.span("lcm_store_append"), self._write_lock:
+            # Timestamps are taken under the lock so `seq` order is timestamp order, as in `ImmutableStore`.
+            msgs: list[Message] = []
+            rows = []
+            for role, content, *rest in records:
+                now = datetime.now(timezone.utc)
+                msg_id = (rest[0] if rest else None) or str(uuid4())
+                msg = Message(id=msg_id, timestamp=now.isoformat(), role=role, content=content)
+                msgs.append(msg)
+                rows.append((msg.id, msg.timestamp, _epoch_us(now), msg.role, msg.content))
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO messages (id, timestamp, ts_us, role, content) VALUES (?, ?, ?, ?, ?)", rows
+                    )
+            except sqlite3.IntegrityError as exc:
+                raise ValueError(f"Duplicate message id in batch of {len(rows)}: {exc}") from exc
+            self._last_seq = self._conn.execute("SELECT MAX(seq) FROM messages").fetchone()[0]
+            return msgs
+
+    @property
+    def end_position(self) -> tuple[int, int]:
+        """`(0, seq)` of the last record; pass it to `iter_from` to read only later appends."""
+        return 0, self._last_seq
+
+    def iter_from(self, position: tuple[int, int]) -> Iterator[Message]:
+        cursor = self._reader().execute(f"SELECT {_COLUMNS} FROM messages WHERE seq > ? ORDER BY seq", (position[1],))
+        for row in cursor:
+            yield Message(*row)
+
+    def all(self) -> list[Message]:
+        return list(self.iter_from((0, 0)))
+
+    def __len__(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def get_by_id(self, message_id: str) -> Message | None:
+        with self.metrics.span("lcm_store_read"):
+            row = self._reader().execute(f"SELECT {_COLUMNS} FROM messages WHERE id = ?", (message_id,)).fetchone()
+        return None if row is None else Message(*row)
+
+    def get_by_ids(self, message_ids: list[str]) -> list[Message]:
+        with self.metrics.span("lcm_store_read"):
+            conn = self._reader()
+            index: dict[str, Message] = {}
+            unique = iter(dict.fromkeys(message_ids))
+            while chunk := list(islice(unique, _MAX_PARAMS)):
+                marks = ",".join("?" * len(chunk))
+                for row in conn.execute(f"SELECT {_COLUMNS} FROM messages WHERE id IN ({marks})", chunk):
+                    index[row[0]] = Message(*row)
+        return [index[mid] for mid in message_ids if mid in index]
+
+    def query_time_range(self, start: datetime, end: datetime) -> list[Message]:
+        if start.tzinfo is None or end.tzinfo is None:
+            raise ValueError("start/end must be timezone-aware datetimes")
+        if start > end:
+            return []
+        with self.metrics.span("lcm_store_read"):
+            rows = self._reader().execute(
+                f"SELECT {_COLUMNS} FROM messages WHERE ts_us BETWEEN ? AND ? ORDER BY seq",
+                (_epoch_us(start), _epoch_us(end)),
+            )
+            return [Message(*row) for row in rows]
+
+    def search(self, query: str, k: int = 10) -> list[Message]:
+        """FTS5 (bm25-ranked) messages matching any term of `query`; requires `search_index=True`."""
+        if not self.search_index:
+            raise RuntimeError("search requires SQLiteStore(..., search_index=True) and SQLite built with FTS5")
+        match = _fts_query(query)
+        if not match or k <= 0:
+            return []
+        with self.metrics.span("lcm_store_read"):
+            rows = self._reader().execute(
+                "SELECT m.id, m.timestamp, m.role, m.content FROM messages_fts "
+                "JOIN messages m ON m.seq = messages_fts.rowid WHERE messages_fts MATCH ? ORDER BY messages_fts.rank LIMIT ?",
+                (match, k),
+            )
+            return [Message(*row) for row in rows]
+
+    def close(self) -> None:
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            conn.close()
+        self._local = threading.local()
+        with self._write_lock:
+            self._conn.close()
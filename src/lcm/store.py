@@ -1,12 +1,40 @@
+"""Append-only message storage.
+
+`ImmutableStore` keeps the live segment as JSONL and seals it into `<path>.segments/` once it reaches
+`segment_bytes`: independently zlib-compressed ~64 KiB blocks (a point read inflates one block) behind
+a footer with id/time bounds. Id and sparse timestamp sidecars make lookups and range queries cheap,
+and an optional BM25 sidecar (`search.py`) backs `search` when `search_index=True`.
+"""
+
 from __future__ import annotations
 
 import json
+import mmap
+import os
+import threading
+import time
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
-from typing import Iterable
+from typing import IO, Iterable, Iterator, Protocol
 from uuid import uuid4
 
+from .metrics import NULL_METRICS, NullMetrics
+from .search import BM25Index
+
+DURABILITY_MODES = ("none", "batch", "interval")
+
+# Sealed segment layout: zlib(block 0) | zlib(block 1) | ... | footer JSON | footer length (8 bytes,
+# little endian) | magic. Blocks hold whole records, so one record is read by inflating one block.
+SEGMENT_MAGIC = b"LCMS"
+SEGMENT_BLOCK_BYTES = 64 * 1024
+_TRAILER_SIZE = 8 + len(SEGMENT_MAGIC)
+
 
 @dataclass(frozen=True)
 class Message:
@@ -16,56 +44,592 @@ class Message:
     content: str
 
 
+class MessageStore(Protocol):
+    """Storage backend contract shared by `ImmutableStore` (JSONL) and `SQLiteStore`.
+
+    Positions are opaque, ordered `(int, int)` pairs: `end_position` may be checkpointed and later passed
+    to `iter_from` on a reopened store of the same backend.
+
+    Message ids are unique: `append_many` raises `ValueError` when a record reuses a stored id or repeats
+    one within its batch, and then writes nothing from that batch.
+    """
+
+    path: Path
+
+    def append(self, role: str, content: str, *, message_id: str | None = None) -> Message: ...
+    def append_many(self, records: Iterable[tuple[str, ...]]) -> list[Message]: ...
+    def get_by_id(self, message_id: str) -> Message | None: ...
+    def get_by_ids(self, message_ids: list[str]) -> list[Message]: ...
+    def query_time_range(self, start: datetime, end: datetime) -> list[Message]: ...
+    def search(self, query: str, k: int = 10) -> list[Message]: ...
+    def all(self) -> list[Message]: ...
+    def iter_from(self, position: tuple[int, int]) -> Iterator[Message]: ...
+    @property
+    def end_position(self) -> tuple[int, int]: ...
+    def __len__(self) -> int: ...
+    def close(self) -> None: ...
+
+
+def _iter_lines(buf, start: int = 0, size: int | None = None) -> Iterator[tuple[int, bytes]]:
+    pos, size = start, len(buf) if size is None else size
+    while pos < size:
+        nl = buf.find(b"\n", pos)
+        end = size if nl < 0 else nl + 1
+        line = buf[pos:end]
+        if line.strip():
+            yield pos, line
+        pos = end
+
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        dir_fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def _read_footer(path: Path) -> dict:
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if len(mm) < _TRAILER_SIZE or mm[-len(SEGMENT_MAGIC):] != SEGMENT_MAGIC:
+            raise ValueError(f"Not a sealed segment: {path}")
+        footer_len = int.from_bytes(mm[-_TRAILER_SIZE:-len(SEGMENT_MAGIC)], "little")
+        footer_start = len(mm) - _TRAILER_SIZE - footer_len
+        footer = json.loads(mm[footer_start:-_TRAILER_SIZE])
+    footer["payload_size"] = footer_start
+    return footer
+
+
 class ImmutableStore:
     """Append-only message store backed by JSONL."""
 
-    def __init__(self, path: str | Path):
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        time_index_stride: int = 64,
+        durability: str = "none",
+        fsync_interval_ms: int = 50,
+        segment_bytes: int | None = 64 * 1024 * 1024,
+        segment_block_bytes: int = SEGMENT_BLOCK_BYTES,
+        block_cache_size: int = 64,
+        search_index: bool = False,
+        metrics: NullMetrics = NULL_METRICS,
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}, got {durability!r}")
         self.path = Path(path)
+        self.metrics = metrics
         self.path.parent.mkdir(parents=True, exist_ok=True)
         if not self.path.exists():
             self.path.touch()
 
+        # `path` is the live segment. Once it reaches `segment_bytes` it is sealed into
+        # `<path>.segments/NNNNNNNN.seg` (compressed, with id/time bounds in a footer) and replaced by a
+        # fresh live file. Record positions are `(segment, offset)` into the uncompressed bytes, so they
+        # survive sealing.
+        self.segments_dir = self.path.with_name(self.path.name + ".segments")
+        self.segment_bytes = segment_bytes
+        self.segment_block_bytes = max(1, segment_block_bytes)
+        self.block_cache_size = max(1, block_cache_size)
+        self._footers: list[dict] = []
+        self._active_seq = 0
+        self._block_cache: OrderedDict[tuple[int, int], bytes] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._recover_segments()
+
+        # Sidecar index: one `[id, segment, offset, length]` JSON line per stored record.
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        # Sparse time index: one `[timestamp, segment, offset]` line every `time_index_stride` records.
+        # Appends are timestamp-ordered, so range queries can bisect to a start position.
+        self.time_index_path = self.path.with_name(self.path.name + ".tidx")
+        self.time_index_stride = max(1, time_index_stride)
+        self._offsets: dict[str, tuple[int, int, int]] = {}
+        self._indexed_pos = (0, 0)
+        self._count = 0
+        self._time_keys: list[datetime] = []
+        self._time_offsets: list[tuple[int, int]] = []
+
+        # Long-lived append handles. Writers serialize on `_write_lock`; fsync is group-committed:
+        # one fsync covers every batch written before it started.
+        self.durability = durability
+        self.fsync_interval = fsync_interval_ms / 1000
+        self._write_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._writer: IO[bytes] | None = None
+        self._index_writer: IO[str] | None = None
+        self._time_writer: IO[str] | None = None
+        self._written_seq = 0
+        self._synced_seq = 0
+        self._last_sync = time.monotonic()
+        self._sync_timer: threading.Timer | None = None
+        self._load_index()
+
+        # Optional BM25 sidecar (`<path>.bm25`), one line per record in store order.
+        self.search_index: BM25Index | None = None
+        if search_index:
+            self.search_index = BM25Index(self.path.with_name(self.path.name + ".bm25"))
+            self._catch_up_search_index()
+
     def append(self, role: str, content: str, *, message_id: str | None = None) -> Message:
-        msg = Message(
-            id=message_id or str(uuid4()),
-            timestamp=datetime.now(timezone.utc).isoformat(),
-            role=role,
-            content=content,
-        )
-        with self.path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(asdict(msg), ensure_ascii=False) + "\n")
-        return msg
+        return self.append_many([(role, content, message_id)])[0]
+
+    def append_many(self, records: Iterable[tuple[str, ...]]) -> list[Message]:
+        """Append `(role, content)` or `(role, content, message_id)` records as one group commit."""
+        with self.metrics.span("lcm_store_append"):
+            return self._append_many(records)
+
+    def _append_many(self, records: Iterable[tuple[str, ...]]) -> list[Message]:
+        records = list(records)
+        if not records:
+            return []
+        with self._write_lock:
+            # Timestamps are taken under the lock so file order is timestamp order, which the sparse
+            # time index and the early exit in `query_time_range` rely on.
+            msgs = [
+                Message(
+                    id=(rest[0] if rest else None) or str(uuid4()),
+                    timestamp=datetime.now(timezone.utc).isoformat(),
+                    role=role,
+                    content=content,
+                )
+                for role, content, *rest in records
+            ]
+            seen: set[str] = set()
+            for msg in msgs:
+                if msg.id in seen or msg.id in self._offsets:
+                    raise ValueError(f"Duplicate message id {msg.id!r} in batch of {len(msgs)}")
+                seen.add(msg.id)
+            lines = [(json.dumps(asdict(m), ensure_ascii=False) + "\n").encode("utf-8") for m in msgs]
+            if self._writer is None:
+                self._writer = self.path.open("ab")
+            offset = self._writer.tell()
+            self._writer.write(b"".join(lines))
+            self._writer.flush()
+            entries = []
+            for msg, data in zip(msgs, lines):
+                entries.append((msg.id, msg.timestamp, self._active_seq, offset, len(data)))
+                offset += len(data)
+            self._index_entries(entries)
+            if self.search_index is not None:
+                self.search_index.add_many((m.id, m.content) for m in msgs)
+            self._written_seq += 1
+            seq = self._written_seq
+            if self.segment_bytes and offset >= self.segment_bytes:
+                self._seal_active()
+
+        if self.durability == "batch":
+            self._sync(seq)
+        elif self.durability == "interval":
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync(seq)
+            else:
+                self._schedule_sync()
+        return msgs
+
+    def _sync(self, seq: int) -> None:
+        with self._sync_lock:
+            if self._synced_seq >= seq or self._writer is None:
+                return
+            target = self._written_seq
+            os.fsync(self._writer.fileno())
+            self._synced_seq = target
+            self._last_sync = time.monotonic()
+
+    def _schedule_sync(self) -> None:
+        with self._sync_lock:
+            if self._sync_timer is not None:
+                return
+            delay = max(0.0, self.fsync_interval - (time.monotonic() - self._last_sync))
+            self._sync_timer = threading.Timer(delay, self._timed_sync)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+
+    def _timed_sync(self) -> None:
+        with self._sync_lock:
+            self._sync_timer = None
+        with self._write_lock:
+            seq = self._written_seq
+        self._sync(seq)
+
+    def sync(self) -> None:
+        """Force everything appended so far to stable storage, regardless of durability mode."""
+        with self._write_lock:
+            seq = self._written_seq
+        self._sync(seq)
+
+    def close(self) -> None:
+        with self._sync_lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+        if self.durability != "none":
+            self.sync()
+        with self._write_lock:
+            for handle in (self._writer, self._index_writer, self._time_writer):
+                if handle is not None:
+                    handle.close()
+            self._writer = self._index_writer = self._time_writer = None
+            if self.search_index is not None:
+                self.search_index.close()
+
+    def __enter__(self) -> "ImmutableStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.segments_dir / f"{seq:08d}.seg"
+
+    def _recover_segments(self) -> None:
+        if not self.segments_dir.exists():
+            return
+        for tmp in self.segments_dir.glob("*.tmp"):
+            tmp.unlink()
+        seqs = sorted(int(p.stem) for p in self.segments_dir.glob("*.seg"))
+        if seqs != list(range(len(seqs))):
+            raise ValueError(f"Missing sealed segments in {self.segments_dir}: found {seqs}")
+        self._footers = [_read_footer(self._segment_path(s)) for s in seqs]
+        self._active_seq = len(seqs)
+        if self._footers:
+            # Crash after sealing but before replacing the live segment: it duplicates the last seal.
+            last = self._footers[-1]
+            raw = self.path.read_bytes()
+            if raw and len(raw) == last["raw_size"] and zlib.crc32(raw) == last["crc32"]:
+                with self.path.open("r+b") as f:
+                    f.truncate(0)
+                    os.fsync(f.fileno())
+
+    def _seal_active(self) -> None:
+        assert self._writer is not None
+        os.fsync(self._writer.fileno())
+        raw = self.path.read_bytes()
+        ids: list[str] = []
+        stamps: list[datetime] = []
+        for _, line in _iter_lines(raw):
+            payload = json.loads(line)
+            ids.append(payload["id"])
+            stamps.append(datetime.fromisoformat(payload["timestamp"]))
+        blocks: list[bytes] = []
+        block_raw: list[int] = []
+        block_comp: list[int] = []
+        block_crc32: list[int] = []
+        comp_size = 0
+        for start, end in self._block_bounds(raw):
+            chunk = raw[start:end]
+            blob = zlib.compress(chunk, 6)
+            block_raw.append(start)
+            block_comp.append(comp_size)
+            block_crc32.append(zlib.crc32(chunk))
+            blocks.append(blob)
+            comp_size += len(blob)
+        footer = {
+            "codec": "zlib-blocks",
+            "count": len(ids),
+            "raw_size": len(raw),
+            "crc32": zlib.crc32(raw),
+            "first_id": ids[0],
+            "last_id": ids[-1],
+            "min_id": min(ids),
+            "max_id": max(ids),
+            "min_ts": min(stamps).isoformat(),
+            "max_ts": max(stamps).isoformat(),
+            "block_raw": block_raw,
+            "block_comp": block_comp,
+            "block_crc32": block_crc32,
+        }
+        footer_bytes = json.dumps(footer).encode("utf-8")
+
+        self.segments_dir.mkdir(exist_ok=True)
+        final = self._segment_path(self._active_seq)
+        tmp = final.with_name(final.name + ".tmp")
+        with tmp.open("wb") as f:
+            f.write(b"".join(blocks) + footer_bytes + len(footer_bytes).to_bytes(8, "little") + SEGMENT_MAGIC)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, final)
+        _fsync_dir(self.segments_dir)
+
+        # Publish the sealed segment before the live file changes, so readers that see the new
+        # `_active_seq` read the sealed copy. The old live file is swapped out rather than truncated:
+        # readers that still have it open or mapped keep reading intact bytes.
+        footer["payload_size"] = comp_size
+        self._footers.append(footer)
+        self._active_seq += 1
+
+        fresh = self.path.with_name(self.path.name + ".tmp")
+        with fresh.open("wb") as f:
+            os.fsync(f.fileno())
+        os.replace(fresh, self.path)
+        _fsync_dir(self.path.parent)
+        self._writer.close()
+        self._writer = self.path.open("ab")
+        with self._sync_lock:
+            self._synced_seq = self._written_seq
+            self._last_sync = time.monotonic()
+
+    def _block_bounds(self, raw: bytes) -> Iterator[tuple[int, int]]:
+        """Line-aligned `[start, end)` ranges of about `segment_block_bytes` covering `raw`."""
+        start, size = 0, len(raw)
+        while start < size:
+            nl = raw.find(b"\n", min(size, start + self.segment_block_bytes) - 1)
+            end = size if nl < 0 else nl + 1
+            yield start, end
+            start = end
+
+    def _block_index(self, seq: int, offset: int) -> int:
+        return bisect_right(self._footers[seq]["block_raw"], offset) - 1
+
+    def _sealed_block(self, seq: int, block: int) -> tuple[int, bytes]:
+        """`(raw offset, bytes)` of one block of a sealed segment, inflated alone and kept in an LRU."""
+        footer = self._footers[seq]
+        base = footer["block_raw"][block]
+        key = (seq, block)
+        with self._cache_lock:
+            raw = self._block_cache.get(key)
+            if raw is not None:
+                self._block_cache.move_to_end(key)
+                return base, raw
+        comp = footer["block_comp"]
+        start = comp[block]
+        end = comp[block + 1] if block + 1 < len(comp) else footer["payload_size"]
+        with self._segment_path(seq).open("rb") as f:
+            f.seek(start)
+            raw = zlib.decompress(f.read(end - start))
+        if zlib.crc32(raw) != footer["block_crc32"][block]:
+            raise ValueError(f"Checksum mismatch in sealed segment {seq}, block {block}")
+        with self._cache_lock:
+            self._block_cache[key] = raw
+            self._block_cache.move_to_end(key)
+            while len(self._block_cache) > self.block_cache_size:
+                self._block_cache.popitem(last=False)
+        return base, raw
+
+    def _iter_segment_lines(self, seq: int, start: int = 0) -> Iterator[tuple[int, bytes]]:
+        """`(offset, line)` records of segment `seq` from `start`; sealed segments inflate block by block."""
+        if seq >= self._active_seq:
+            with self._live_view(seq) as buf:
+                if buf is not None:
+                    # Stop at the last newline: a concurrent append may have written part of a batch.
+                    yield from _iter_lines(buf, start, buf.rfind(b"\n") + 1)
+                    return
+        for block in range(self._block_index(seq, start), len(self._footers[seq]["block_raw"])):
+            base, raw = self._sealed_block(seq, block)
+            for pos, line in _iter_lines(raw, max(0, start - base)):
+                yield base + pos, line
+
+    @contextmanager
+    def _live_view(self, seq: int) -> Iterator[bytes | mmap.mmap | None]:
+        """The live file while it still holds segment `seq`, or None once `seq` has been sealed."""
+        with self.path.open("rb") as f:
+            # Checked after opening: sealing bumps `_active_seq` before it swaps the live file.
+            if seq < self._active_seq:
+                yield None
+            elif os.fstat(f.fileno()).st_size == 0:
+                yield b""
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    yield mm
+
+    def _segment_size(self, seq: int) -> int:
+        if seq < self._active_seq:
+            return self._footers[seq]["raw_size"]
+        return self.path.stat().st_size
 
     def _iter_all(self) -> Iterable[Message]:
-        with self.path.open("r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
+        return self.iter_from((0, 0))
+
+    @property
+    def end_position(self) -> tuple[int, int]:
+        """`(segment, offset)` just past the last record; pass it to `iter_from` to read only later appends."""
+        return self._indexed_pos
+
+    def iter_from(self, position: tuple[int, int]) -> Iterator[Message]:
+        first_seq, first_offset = position
+        for seq in range(first_seq, self._active_seq + 1):
+            for _, line in self._iter_segment_lines(seq, first_offset if seq == first_seq else 0):
+                yield Message(**json.loads(line))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _scan_records(self, start: tuple[int, int] = (0, 0)) -> Iterable[tuple[str, str, int, int, int]]:
+        first_seq, first_offset = start
+        for seq in range(first_seq, self._active_seq + 1):
+            for offset, line in self._iter_segment_lines(seq, first_offset if seq == first_seq else 0):
                 payload = json.loads(line)
-                yield Message(**payload)
+                yield payload["id"], payload["timestamp"], seq, offset, len(line)
+
+    def _index_entries(self, entries: list[tuple[str, str, int, int, int]]) -> None:
+        if not entries:
+            return
+        id_lines: list[str] = []
+        time_lines: list[str] = []
+        for mid, ts, seq, offset, length in entries:
+            id_lines.append(json.dumps([mid, seq, offset, length], ensure_ascii=False) + "\n")
+            if self._count % self.time_index_stride == 0:
+                time_lines.append(json.dumps([ts, seq, offset]) + "\n")
+                self._add_time_key(ts, seq, offset)
+            self._count += 1
+            self._offsets.setdefault(mid, (seq, offset, length))
+            self._indexed_pos = max(self._indexed_pos, (seq, offset + length))
+        if self._index_writer is None:
+            self._index_writer = self.index_path.open("a", encoding="utf-8")
+        self._index_writer.write("".join(id_lines))
+        self._index_writer.flush()
+        if time_lines:
+            if self._time_writer is None:
+                self._time_writer = self.time_index_path.open("a", encoding="utf-8")
+            self._time_writer.write("".join(time_lines))
+            self._time_writer.flush()
+
+    def _add_time_key(self, ts: str, seq: int, offset: int) -> None:
+        self._time_keys.append(datetime.fromisoformat(ts))
+        self._time_offsets.append((seq, offset))
+
+    def _read_sidecar(self) -> bool:
+        try:
+            with self.index_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    mid, seq, offset, length = json.loads(line)
+                    self._count += 1
+                    self._offsets.setdefault(mid, (seq, offset, length))
+                    self._indexed_pos = max(self._indexed_pos, (seq, offset + length))
+            with self.time_index_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._add_time_key(*json.loads(line))
+        except (OSError, ValueError, TypeError):
+            return False
+        seq, end = self._indexed_pos
+        if seq > self._active_seq or end > self._segment_size(seq):
+            return False
+        if self._time_offsets and self._time_offsets[-1] >= self._indexed_pos:
+            return False
+        if len(self._time_offsets) != -(-self._count // self.time_index_stride):
+            return False
+        if self._offsets:
+            # Spot-check the tail entry against the log so a sidecar from a different store is rejected.
+            last_id = max(self._offsets, key=lambda k: self._offsets[k][:2])
+            try:
+                return self._read_at(*self._offsets[last_id]).id == last_id
+            except (ValueError, TypeError, KeyError):
+                return False
+        return True
+
+    def _rebuild_index(self) -> None:
+        self._offsets = {}
+        self._indexed_pos = (0, 0)
+        self._count = 0
+        self._time_keys = []
+        self._time_offsets = []
+        for sidecar in (self.index_path, self.time_index_path):
+            tmp = sidecar.with_name(sidecar.name + ".tmp")
+            tmp.write_text("", encoding="utf-8")
+            os.replace(tmp, sidecar)
+        self._index_entries(list(self._scan_records()))
+
+    def _load_index(self) -> None:
+        if not self._read_sidecar():
+            self._rebuild_index()
+            return
+        if self._indexed_pos < (self._active_seq, self._segment_size(self._active_seq)):
+            # Records appended without updating the sidecar (e.g. crash between the two writes).
+            self._index_entries(list(self._scan_records(self._indexed_pos)))
+
+    def _catch_up_search_index(self) -> None:
+        index = self.search_index
+        assert index is not None
+        indexed = len(index)
+        if indexed > self._count or (indexed and index.last_id not in self._offsets):
+            index.clear()
+            indexed = 0
+        if indexed < self._count:
+            # Records appended without reaching the search sidecar (crash, or index enabled later).
+            index.add_many((m.id, m.content) for m in islice(self._iter_all(), indexed, None))
+
+    def _read_at(self, seq: int, offset: int, length: int) -> Message:
+        if seq >= self._active_seq:
+            with self._live_view(seq) as buf:
+                if buf is not None:
+                    return Message(**json.loads(buf[offset : offset + length]))
+        base, raw = self._sealed_block(seq, self._block_index(seq, offset))
+        return Message(**json.loads(raw[offset - base : offset - base + length]))
 
     def all(self) -> list[Message]:
         return list(self._iter_all())
 
     def get_by_id(self, message_id: str) -> Message | None:
-        for msg in self._iter_all():
-            if msg.id == message_id:
-                return msg
-        return None
+        loc = self._offsets.get(message_id)
+        if loc is None:
+            return None
+        with self.metrics.span("lcm_store_read"):
+            return self._read_at(*loc)
 
     def get_by_ids(self, message_ids: list[str]) -> list[Message]:
-        wanted = set(message_ids)
-        result = [m for m in self._iter_all() if m.id in wanted]
-        index = {m.id: m for m in result}
+        with self.metrics.span("lcm_store_read"):
+            return self._get_by_ids(message_ids)
+
+    def _get_by_ids(self, message_ids: list[str]) -> list[Message]:
+        by_segment: dict[int, list[str]] = {}
+        for mid in dict.fromkeys(message_ids):
+            loc = self._offsets.get(mid)
+            if loc is not None:
+                by_segment.setdefault(loc[0], []).append(mid)
+        index: dict[str, Message] = {}
+        for seq in sorted(by_segment):
+            mids = sorted(by_segment[seq], key=lambda m: self._offsets[m][1])
+            if seq >= self._active_seq:
+                with self._live_view(seq) as buf:
+                    if buf is not None:
+                        for mid in mids:
+                            _, offset, length = self._offsets[mid]
+                            index[mid] = Message(**json.loads(buf[offset : offset + length]))
+                        continue
+            # Offset order touches each needed block once; untouched blocks stay compressed.
+            for mid in mids:
+                index[mid] = self._read_at(*self._offsets[mid])
         return [index[mid] for mid in message_ids if mid in index]
 
+    def search(self, query: str, k: int = 10) -> list[Message]:
+        """BM25-ranked messages matching `query`; requires `search_index=True`."""
+        if self.search_index is None:
+            raise RuntimeError("search requires ImmutableStore(..., search_index=True)")
+        with self.metrics.span("lcm_store_read"):
+            return self._get_by_ids([mid for mid, _ in self.search_index.search(query, k)])
+
     def query_time_range(self, start: datetime, end: datetime) -> list[Message]:
         if start.tzinfo is None or end.tzinfo is None:
             raise ValueError("start/end must be timezone-aware datetimes")
+        if start > end:
+            return []
+        with self.metrics.span("lcm_store_read"):
+            return self._query_time_range(start, end)
+
+    def _query_time_range(self, start: datetime, end: datetime) -> list[Message]:
         out: list[Message] = []
-        for msg in self._iter_all():
-            ts = datetime.fromisoformat(msg.timestamp)
-            if start <= ts <= end:
-                out.append(msg)
+        # Last sparse entry strictly before `start`: every record ahead of it is older than the window.
+        i = bisect_left(self._time_keys, start) - 1
+        first_seq, first_offset = self._time_offsets[i] if i >= 0 else (0, 0)
+        for seq in range(first_seq, self._active_seq + 1):
+            if seq < self._active_seq:
+                # Footer bounds let a scan skip or stop at sealed segments without decompressing them.
+                footer = self._footers[seq]
+                if datetime.fromisoformat(footer["min_ts"]) > end:
+                    break
+                if datetime.fromisoformat(footer["max_ts"]) < start:
+                    continue
+            for _, line in self._iter_segment_lines(seq, first_offset if seq == first_seq else 0):
+                msg = Message(**json.loads(line))
+                ts = datetime.fromisoformat(msg.timestamp)
+                if ts > end:
+                    return out
+                if ts >= start:
+                    out.append(msg)
         return out
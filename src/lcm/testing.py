@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal", "exponential")
+
+
+class FakeLLMServer:
+    """Local OpenAI-compatible `/chat/completions` stand-in with configurable latency, errors and rate limits."""
+
+    def __init__(
+        self,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: str | Callable[[random.Random], float] = "fixed",
+        latency_ms: float = 50.0,
+        latency_spread: float = 0.5,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        rate_limit_rps: float | None = None,
+        summary_words: int = 60,
+        seed: int | None = None,
+    ):
+        if isinstance(latency, str) and latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency must be one of {LATENCY_DISTRIBUTIONS} or a callable, got {latency!r}")
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_spread = latency_spread
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit_rps = rate_limit_rps
+        self.summary_words = summary_words
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bucket = float(max(1.0, rate_limit_rps or 0.0))
+        self._bucket_updated = time.monotonic()
+        self.stats: dict[str, int] = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0}
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def api_base(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _sample_latency(self) -> float:
+        with self._lock:
+            if callable(self.latency):
+                return max(0.0, self.latency(self._rng))
+            base = self.latency_ms / 1000
+            if self.latency == "uniform":
+                return self._rng.uniform(base * (1 - self.latency_spread), base * (1 + self.latency_spread))
+            if self.latency == "lognormal":
+                return base * self._rng.lognormvariate(0.0, self.latency_spread)
+            if self.latency == "exponential":
+                return self._rng.expovariate(1 / base) if base > 0 else 0.0
+            return base
+
+    def _admit(self) -> bool:
+        if not self.rate_limit_rps:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            capacity = max(1.0, self.rate_limit_rps)
+            self._bucket = min(capacity, self._bucket + (now - self._bucket_updated) * self.rate_limit_rps)
+            self._bucket_updated = now
+            if self._bucket < 1:
+                return False
+            self._bucket -= 1
+            return True
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def _record(self, counter: str) -> None:
+        with self._lock:
+            self.stats[counter] += 1
+
+    def _complete(self, payload: dict) -> dict:
+        prompt = next((m["content"] for m in reversed(payload.get("messages", [])) if m.get("role") == "user"), "")
+        body = prompt.split("\n\n", 1)[-1]
+        words = body.split()[: self.summary_words]
+        return {
+            "id": "fake-completion",
+            "object": "chat.completion",
+            "model": payload.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(words)},
+        }
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+            def _reply(self, status: int, body: dict, headers: dict[str, str] | None = None) -> None:
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self) -> None:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                server._record("requests")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._reply(404, {"error": {"message": f"unknown path {self.path}"}})
+                    return
+                if not server._admit():
+                    server._record("throttled")
+                    retry_after = 1 / server.rate_limit_rps if server.rate_limit_rps else 1
+                    self._reply(429, {"error": {"message": "rate limited"}}, {"Retry-After": f"{retry_after:.3f}"})
+                    return
+                time.sleep(server._sample_latency())
+                if server._should_fail():
+                    server._record("errors")
+                    self._reply(server.error_status, {"error": {"message": "injected failure"}})
+                    return
+                server._record("ok")
+                self._reply(200, server._complete(payload))
+
+        return Handler
+
+    def start(self) -> "FakeLLMServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
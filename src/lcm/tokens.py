@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+class TokenCounter:
+    """Shared token counter: tiktoken when available, word count otherwise, with a bounded LRU memo."""
+
+    def __init__(
+        self,
+        encoding: str | None = "cl100k_base",
+        *,
+        counter: Callable[[str], int] | None = None,
+        cache_size: int = 65536,
+    ):
+        self.encoding_name = encoding
+        self.cache_size = cache_size
+        self._counter = counter
+        self._encoder: Any = None
+        self._encoder_loaded = False
+        self._cache: OrderedDict[bytes, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: dict[str, int] = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def word_count(text: str) -> int:
+        return max(1, len(text.split())) if text.strip() else 0
+
+    @property
+    def backend(self) -> str:
+        if self._counter is not None:
+            return "custom"
+        return f"tiktoken:{self.encoding_name}" if self._load_encoder() is not None else "words"
+
+    def _load_encoder(self) -> Any:
+        if self._encoder_loaded:
+            return self._encoder
+        with self._lock:
+            if not self._encoder_loaded:
+                if self.encoding_name:
+                    try:
+                        import tiktoken
+
+                        self._encoder = tiktoken.get_encoding(self.encoding_name)
+                    except Exception:
+                        # tiktoken missing, or its encoding file cannot be fetched/loaded.
+                        self._encoder = None
+                self._encoder_loaded = True
+        return self._encoder
+
+    def _count_batch(self, texts: list[str]) -> list[int]:
+        if self._counter is not None:
+            return [self._counter(t) for t in texts]
+        encoder = self._load_encoder()
+        if encoder is None:
+            return [self.word_count(t) for t in texts]
+        encoded = encoder.encode_ordinary_batch(texts)
+        return [len(tokens) if text.strip() else 0 for text, tokens in zip(texts, encoded)]
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def count_many(self, texts: list[str]) -> list[int]:
+        keys = [self._key(t) for t in texts]
+        out: list[int | None] = [None] * len(texts)
+        missing: dict[bytes, str] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing[key] = texts[i]
+                    continue
+                self._cache.move_to_end(key)
+                out[i] = cached
+            self.stats["hits"] += len(texts) - len(missing)
+            self.stats["misses"] += len(missing)
+        if missing:
+            counted = dict(zip(missing, self._count_batch(list(missing.values()))))
+            with self._lock:
+                for key, value in counted.items():
+                    self._cache[key] = value
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            for i, key in enumerate(keys):
+                if out[i] is None:
+                    out[i] = counted[key]
+        return out  # type: ignore[return-value]
+
+    def count(self, text: str) -> int:
+        return self.count_many([text])[0]
+
+    def __call__(self, text: str) -> int:
+        return self.count(text)
+
+
+_default: TokenCounter | None = None
+_default_lock = threading.Lock()
+
+
+def default_token_counter() -> TokenCounter:
+    """Process-wide counter; `LCM_TOKENIZER` selects the tiktoken encoding, or `words` to disable it."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                name = os.getenv("LCM_TOKENIZER", "cl100k_base")
+                _default = TokenCounter(None if name == "words" else name)
+    return _default
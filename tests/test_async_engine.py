@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+import pytest
+
+from lcm.compactor import AsyncCompactor
+from lcm.engine import AsyncLCMEngine
+from lcm.ratelimit import RateLimiter
+
+
+def test_async_engines_share_one_client_and_stay_lossless(tmp_path, monkeypatch):
+    monkeypatch.delenv("LCM_DISABLE_LLM", raising=False)
+    monkeypatch.setenv("KIMI_API_KEY", "test")
+    in_flight = {"now": 0, "peak": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return httpx.Response(200, json={"choices": [{"message": {"content": "summary"}}]})
+
+    async def run() -> list[AsyncLCMEngine]:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        limiter = RateLimiter()
+        engines = [
+            AsyncLCMEngine(tmp_path / f"s{i}.jsonl", tau_soft=60, tau_hard=120, client=client, rate_limiter=limiter)
+            for i in range(20)
+        ]
+
+        async def converse(engine: AsyncLCMEngine) -> None:
+            for turn in range(10):
+                await engine.receive("user", f"turn {turn} " + "word " * 30)
+            await engine.context.drain()
+
+        await asyncio.gather(*(converse(e) for e in engines))
+        await client.aclose()
+        return engines
+
+    engines = asyncio.run(run())
+    assert in_flight["peak"] > 1
+    for engine in engines:
+        stored = engine.store.all()
+        assert len(stored) == 10
+        active = engine.context.get_active_context()
+        assert active["token_estimate"] <= 120
+        covered = [mid for node in active["summaries"] for mid in engine.dag.expand(node.id)]
+        assert covered + [m.id for m in active["recent_messages"]] == [m.id for m in stored]
+
+
+def test_async_engine_owns_no_threads_and_closes_asynchronously(tmp_path):
+    async def run() -> AsyncLCMEngine:
+        engine = AsyncLCMEngine(tmp_path / "s.jsonl", tau_soft=60, tau_hard=120)
+        await engine.receive("user", "hello " * 80)
+        await engine.aclose()
+        return engine
+
+    engine = asyncio.run(run())
+    assert not hasattr(engine.context, "_executor")
+    assert engine.compactor._client.is_closed
+    with pytest.raises(TypeError, match="aclose"):
+        engine.compactor.close()
+
+    speculative = AsyncCompactor(speculative=True)
+    assert not hasattr(speculative, "_speculative_pool")
+    asyncio.run(speculative.aclose())
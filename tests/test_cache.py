@@ -0,0 +1,44 @@
+import httpx
+
+from lcm.cache import SummaryCache
+from lcm.compactor import Compactor
+from lcm.store import Message
+
+
+def test_cache_hit_skips_llm_and_persists(tmp_path, monkeypatch):
+    monkeypatch.delenv("LCM_DISABLE_LLM", raising=False)
+    calls = {"n": 0}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        return httpx.Response(200, json={"choices": [{"message": {"content": "cached summary"}}]})
+
+    def make() -> Compactor:
+        return Compactor(
+            api_key="test",
+            client=httpx.Client(transport=httpx.MockTransport(handler)),
+            cache=SummaryCache(tmp_path / "cache"),
+        )
+
+    msgs = [Message(id="1", timestamp="", role="user", content="hello " * 50)]
+    first = make()
+    assert first.compress(msgs, target_tokens=100) == ("normal", "[NORMAL] cached summary")
+    assert first.cache_stats == {"hits": 0, "misses": 1, "evictions": 0}
+
+    second = make()  # fresh process view of the same directory
+    assert second.compress(msgs, target_tokens=100) == ("normal", "[NORMAL] cached summary")
+    assert second.cache_stats["hits"] == 1
+    assert calls["n"] == 1
+
+
+def test_cache_evicts_least_recently_used_by_size(tmp_path):
+    cache = SummaryCache(tmp_path, max_bytes=10)
+    cache.put("a" * 64, "12345")
+    cache.put("b" * 64, "12345")
+    assert cache.get("a" * 64) == "12345"
+    cache.put("c" * 64, "12345")
+
+    assert cache.get("b" * 64) is None
+    assert len(cache) == 2
+    assert cache.stats["evictions"] == 1
+    assert len(SummaryCache(tmp_path, max_bytes=10)) == 2
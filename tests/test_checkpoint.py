@@ -0,0 +1,62 @@
+from lcm.engine import LCMEngine
+
+
+def _fill(engine, start, stop):
+    for i in range(start, stop):
+        engine.receive("user" if i % 2 else "assistant", f"turn {i} " + "detail " * 12)
+
+
+def test_restart_replays_only_the_tail(tmp_path):
+    path = tmp_path / "store.jsonl"
+    engine = LCMEngine(path, tau_soft=80, tau_hard=140, checkpoint=True)
+    _fill(engine, 0, 40)
+    engine.checkpoint()
+    _fill(engine, 40, 45)  # never checkpointed: simulated crash
+    engine.context.drain()
+    expected = engine.context.get_active_context()
+
+    restarted = LCMEngine(path, tau_soft=80, tau_hard=140, checkpoint=True)
+    replayed = []
+    add_message = restarted.context.add_message
+    restarted.context.add_message = lambda msg: (replayed.append(msg.id), add_message(msg))
+    restarted.bootstrap_from_store()
+    restarted.context.drain()
+    active = restarted.context.get_active_context()
+
+    assert [m.content.split()[1] for m in restarted.store.get_by_ids(replayed)] == [str(i) for i in range(40, 45)]
+    assert [m.id for m in active["recent_messages"]] == [m.id for m in expected["recent_messages"]]
+    assert [s.content for s in active["summaries"]] == [s.content for s in expected["summaries"]]
+    assert active["token_estimate"] == expected["token_estimate"]
+    # The crashed run's post-checkpoint nodes were rolled back instead of duplicated.
+    assert len(restarted.dag.nodes) == len(engine.dag.nodes)
+    restarted.close()
+
+
+def test_clean_close_restores_without_replay(tmp_path):
+    path = tmp_path / "store.jsonl"
+    engine = LCMEngine(path, tau_soft=80, tau_hard=140, checkpoint=True)
+    _fill(engine, 0, 30)
+    engine.close()
+    expected = engine.context.get_active_context()["token_estimate"]
+
+    restarted = LCMEngine(path, tau_soft=80, tau_hard=140, checkpoint=True)
+    restarted.bootstrap_from_store()
+    assert sum(restarted.compactor.compress_stats.values()) == 0
+    assert restarted.context.get_active_context()["token_estimate"] == expected
+    _fill(restarted, 30, 32)
+    restarted.close()
+
+
+def test_unusable_checkpoint_falls_back_to_full_replay(tmp_path):
+    path = tmp_path / "store.jsonl"
+    engine = LCMEngine(path, tau_soft=80, tau_hard=140, checkpoint=True)
+    _fill(engine, 0, 20)
+    engine.close()
+    (tmp_path / "store.jsonl.ckpt").write_text("{not json", encoding="utf-8")
+
+    restarted = LCMEngine(path, tau_soft=80, tau_hard=140, checkpoint=True)
+    assert len(restarted.dag.nodes) == 0
+    restarted.bootstrap_from_store()
+    restarted.context.drain()
+    assert restarted.context.get_active_context()["token_estimate"] <= 140
+    assert len(restarted.dag.nodes) == len(engine.dag.nodes)
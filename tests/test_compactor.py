@@ -1,5 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
 from lcm.compactor import Compactor
 from lcm.store import Message
+from lcm.tokens import TokenCounter
 
 
 def _messages(n: int) -> list[Message]:
@@ -15,7 +20,7 @@ def _messages(n: int) -> list[Message]:
 
 
 def test_deterministic_fallback_respects_budget():
-    comp = Compactor()
+    comp = Compactor(token_counter=TokenCounter(encoding=None))
     msgs = _messages(4)
     text = comp.deterministic_fallback(msgs, max_tokens=20)
     assert comp.token_counter(text) <= 25  # prefix may add tiny overhead in simplistic estimator
@@ -28,3 +33,51 @@ def test_compress_converges_to_target():
     level, text = comp.compress(msgs, target_tokens=30)
     assert level in {"normal", "aggressive", "deterministic_fallback"}
     assert comp.token_counter(text) <= 30
+
+
+def test_fallback_bisection_matches_linear_search():
+    comp = Compactor(token_counter=lambda text: len(text) // 4)
+    msgs = _messages(30)
+    for target in (3, 17, 64, 250):
+        _, text = comp._fallback_within(msgs, target)
+        linear = target
+        expected = comp.deterministic_fallback(msgs, max_tokens=linear)
+        while comp.token_counter(expected) > target and linear > 1:
+            linear -= 1
+            expected = comp.deterministic_fallback(msgs, max_tokens=linear)
+        assert text == expected
+
+
+def test_ladder_skips_levels_that_keep_missing_the_budget():
+    class Counting(Compactor):
+        calls: list[str] = []
+
+        def normal_compress(self, messages, target_tokens=None):
+            self.calls.append("normal")
+            return super().normal_compress(messages, target_tokens)
+
+    comp = Counting(token_counter=TokenCounter(encoding=None), ladder_min_samples=2, ladder_probe_every=4)
+    msgs = _messages(8)
+    for _ in range(6):
+        assert comp.compress(msgs, target_tokens=5)[0] == "deterministic_fallback"
+    # Two misses establish the prediction; afterwards normal is only re-probed periodically.
+    assert comp.calls.count("normal") == 3
+
+
+def test_speculative_ladder_prefers_normal():
+    comp = Compactor(token_counter=TokenCounter(encoding=None), speculative=True)
+    level, text = comp.compress(_messages(2), target_tokens=500)
+    assert level == "normal"
+    assert text.startswith("[NORMAL]")
+    comp.close()
+
+
+def test_speculative_pool_is_shared_and_closed():
+    comp = Compactor(token_counter=TokenCounter(encoding=None), speculative=True)
+    pool = comp._speculative_pool
+    with ThreadPoolExecutor(max_workers=8) as callers:
+        list(callers.map(lambda _: comp.compress(_messages(2), target_tokens=500), range(16)))
+    assert comp._speculative_pool is pool
+    comp.close()
+    with pytest.raises(RuntimeError):
+        pool.submit(int)
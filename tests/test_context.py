@@ -1,3 +1,5 @@
+import time
+
 from lcm.compactor import Compactor
 from lcm.context import ContextManager
 from lcm.dag import SummaryDAG
@@ -20,3 +22,75 @@ def test_context_soft_and_hard_compression():
     assert active["token_estimate"] <= 120
     assert len(active["summaries"]) >= 1
     assert len(active["recent_messages"]) <= 6
+
+
+def test_running_token_total_matches_recount():
+    comp = Compactor()
+    dag = SummaryDAG()
+    ctx = ContextManager(compactor=comp, dag=dag, tau_soft=60, tau_hard=120, recent_window=2)
+
+    for i in range(20):
+        ctx.add_message(_msg(i))
+        ctx.get_active_context()
+        expected = comp.count_messages_tokens(ctx.recent_messages) + sum(
+            dag.nodes[nid].token_count for nid in ctx.summary_node_ids
+        )
+        assert ctx._total_tokens() == expected
+
+
+class _SlowFirstCompactor(Compactor):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def compress(self, messages, target_tokens):
+        self.calls += 1
+        if self.calls == 1:
+            time.sleep(0.2)
+        return "normal", f"summary of {messages[0].id}"
+
+
+def test_soft_compactions_commit_in_block_order():
+    comp = _SlowFirstCompactor()
+    dag = SummaryDAG()
+    ctx = ContextManager(compactor=comp, dag=dag, tau_soft=60, tau_hard=1000, recent_window=1, max_workers=3)
+
+    for i in range(8):
+        ctx.add_message(_msg(i))
+    assert len(ctx._pending) >= 2
+    ctx.drain()
+
+    covered = [mid for nid in ctx.summary_node_ids for mid in dag.expand(nid)]
+    assert covered == [str(i) for i in range(len(covered))]
+    assert ctx._total_tokens() <= 1000
+
+
+def test_bulk_ingest_builds_a_balanced_tree():
+    comp = Compactor()
+    dag = SummaryDAG()
+    ctx = ContextManager(compactor=comp, dag=dag, tau_soft=200, tau_hard=400, recent_window=3)
+    msgs = [_msg(i) for i in range(120)]
+    ctx.add_messages(msgs, fanout=4)
+
+    active = ctx.get_active_context()
+    assert active["token_estimate"] <= 400
+    assert [m.id for m in active["recent_messages"]] == ["117", "118", "119"]
+    leaves = dag.get_at_level(1)
+    assert all(len(dag.leaf_message_ids(n.id)) <= 6 for n in leaves)
+    # Every message is reachable exactly once, and the tree is log-depth rather than a chain.
+    covered = [mid for nid in ctx.summary_node_ids for mid in dag.expand(nid)]
+    assert covered == [str(i) for i in range(117)]
+    depth = max(n.level for n in dag.nodes.values())
+    assert depth <= 1 + -(-len(leaves).bit_length() // 2)
+    expected = comp.count_messages_tokens(ctx.recent_messages) + sum(
+        dag.nodes[nid].token_count for nid in ctx.summary_node_ids
+    )
+    assert ctx._total_tokens() == expected
+
+
+def test_bulk_ingest_below_soft_keeps_everything_recent():
+    ctx = ContextManager(compactor=Compactor(), dag=SummaryDAG(), tau_soft=200, tau_hard=400, recent_window=2)
+    ctx.add_message(_msg(0))
+    ctx.add_messages([_msg(1), _msg(2), _msg(3)])
+    assert [m.id for m in ctx.recent_messages] == ["0", "1", "2", "3"]
+    assert ctx.summary_node_ids == []
@@ -1,3 +1,5 @@
+import json
+
 from lcm.dag import SummaryDAG
 from lcm.store import Message
 
@@ -49,3 +51,70 @@ def test_save_load_roundtrip(tmp_path):
 
     assert set(loaded.nodes.keys()) == set(dag.nodes.keys())
     assert loaded.expand(p.id) == ["m1", "m2"]
+
+
+def test_journal_replay_and_compaction(tmp_path):
+    path = tmp_path / "dag.json"
+    dag = SummaryDAG.open(path)
+    n1 = dag.add_summary([_msg(1)], "s1")
+    n2 = dag.add_summary([_msg(2)], "s2")
+    dag.checkpoint()
+
+    replayed = SummaryDAG.load(path)
+    assert list(replayed.nodes) == [n1.id, n2.id]
+
+    dag.compact()
+    p = dag.add_summary([], "parent", child_node_ids=[n1.id, n2.id])
+    dag.close()
+    assert len(SummaryDAG._journal_path(path).read_text().splitlines()) == 1
+
+    reopened = SummaryDAG.open(path)
+    assert reopened.expand(p.id) == ["m1", "m2"]
+    assert reopened.nodes[p.id].level == 2
+
+
+def test_load_legacy_snapshot_and_expand_deep_tree(tmp_path):
+    legacy = {
+        "nodes": [
+            {"id": "a", "content": "s1", "children_ids": [], "level": 1, "token_count": 1},
+            {"id": "b", "content": "s2", "children_ids": [], "level": 1, "token_count": 1},
+            {"id": "p", "content": "parent", "children_ids": ["a", "b"], "level": 2, "token_count": 1},
+        ],
+        "node_to_message_ids": {"a": ["m1", "m2"], "b": ["m2", "m3"], "p": ["m1", "m2", "m3"]},
+    }
+    path = tmp_path / "legacy.json"
+    path.write_text(json.dumps(legacy), encoding="utf-8")
+
+    dag = SummaryDAG.load(path)
+    assert dag.expand("p") == ["m1", "m2", "m3"]
+    assert dict(dag.node_to_message_ids) == legacy["node_to_message_ids"]
+
+    root = dag.add_summary([], "root", child_node_ids=["p", "a"])
+    assert dag.expand(root.id) == ["m1", "m2", "m3"]
+    assert root.level == 3
+
+
+def test_reverse_and_level_indexes_survive_reload_and_rollback(tmp_path):
+    path = tmp_path / "dag.json"
+    dag = SummaryDAG.open(path)
+    a = dag.add_summary([_msg(1), _msg(2)], "a")
+    b = dag.add_summary([_msg(2), _msg(3)], "b")  # m2 is covered by two leaves
+    c = dag.add_summary([_msg(4)], "c")
+    ab = dag.add_summary([], "ab", child_node_ids=[a.id, b.id])
+    top = dag.add_summary([], "top", child_node_ids=[ab.id, c.id])
+
+    assert [n.id for n in dag.covering("m2")] == [a.id, b.id, ab.id, top.id]
+    assert [n.id for n in dag.covering("m4")] == [c.id, top.id]
+    assert dag.covering("unknown") == []
+    assert [n.id for n in dag.parents(a.id)] == [ab.id]
+    assert [n.id for n in dag.get_at_level(3)] == [top.id]
+    dag.close()
+
+    loaded = SummaryDAG.load(path)  # journal only: indexes are rebuilt during replay
+    assert [n.id for n in loaded.covering("m2")] == [a.id, b.id, ab.id, top.id]
+    assert [n.id for n in loaded.get_at_level(1)] == [a.id, b.id, c.id]
+
+    loaded.rollback(3)
+    assert [n.id for n in loaded.covering("m2")] == [a.id, b.id]
+    assert loaded.get_at_level(2) == [] and loaded.parents(a.id) == []
+    assert [n.id for n in loaded.roots()] == [a.id, b.id, c.id]
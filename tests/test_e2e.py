@@ -68,3 +68,21 @@ def test_lcm_e2e_50_rounds(tmp_path):
     assert stats["normal"] >= 1
     assert stats["aggressive"] >= 1
     assert stats["deterministic_fallback"] >= 1
+
+
+def test_receive_many_matches_incremental_budget(tmp_path):
+    records = [("user" if i % 2 else "assistant", f"turn={i} " + "fact " * 40) for i in range(150)]
+    bulk = LCMEngine(tmp_path / "bulk.jsonl", tau_soft=600, tau_hard=1000)
+    active = bulk.receive_many(records)
+
+    assert len(bulk.store) == 150
+    assert active["token_estimate"] <= 1000
+    assert active["recent_messages"][-1].content == records[-1][1]
+    summarized = [mid for node in active["summaries"] for mid in bulk.dag.expand(node.id)]
+    recent = [m.id for m in active["recent_messages"]]
+    assert summarized + recent == [m.id for m in bulk.store.all()]
+
+    # Later turns continue incrementally on top of the imported tree.
+    active = bulk.receive("user", "after import")
+    assert active["recent_messages"][-1].content == "after import"
+    assert active["token_estimate"] <= 1000
@@ -0,0 +1,94 @@
+import json
+import mmap
+
+import httpx
+import pytest
+
+from lcm.compactor import Compactor
+from lcm.dag import SummaryDAG
+from lcm.file_handler import FileHandler, _chunk_bounds
+from lcm.tokens import TokenCounter
+
+
+def _write_log(path, lines):
+    path.write_text("".join(f"{line}\n" for line in lines), encoding="utf-8")
+
+
+def test_register_keeps_caller_summary(tmp_path):
+    handler = FileHandler()
+    rec = handler.register(tmp_path / "x.txt", "caller summary")
+    assert handler.get(rec.file_id).exploration_summary == "caller summary"
+
+
+def test_chunk_bounds_align_to_lines_and_utf8(tmp_path):
+    path = tmp_path / "data.txt"
+    _write_log(path, [f"行 {i} " + "数据" * 10 for i in range(50)])
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        bounds = list(_chunk_bounds(buf, 200))
+        assert bounds[0][0] == 0 and bounds[-1][1] == len(buf)
+        assert all(a[1] == b[0] for a, b in zip(bounds, bounds[1:]))
+        for start, end in bounds:
+            buf[start:end].decode("utf-8")  # never splits a character
+
+
+def test_ingest_builds_lossless_dag_with_dedupe(tmp_path):
+    path = tmp_path / "app.log"
+    block = [f"request {i:04d} served in {i % 7}ms".ljust(63) for i in range(40)]  # 64-byte lines
+    _write_log(path, block + block + [f"shutdown step {i}" for i in range(40)])
+    dag = SummaryDAG()
+    handler = FileHandler(compactor=Compactor(), dag=dag, chunk_bytes=256, fanout=3, max_workers=4)
+    rec = handler.ingest(path)
+
+    assert rec.size == path.stat().st_size
+    assert rec.exploration_summary == dag.nodes[rec.root_node_id].content
+    pointers = dag.expand(rec.root_node_id)
+    assert len(pointers) == len(rec.chunk_node_ids) == handler.stats["chunks"]
+    assert "".join(handler.read_pointer(p) for p in pointers) == path.read_text(encoding="utf-8")
+    assert handler.stats["deduped"] > 0
+    assert handler.stats["summarized"] + handler.stats["deduped"] == handler.stats["chunks"]
+
+    # Re-ingesting the same bytes costs no new chunk summaries.
+    before = handler.stats["summarized"]
+    again = handler.ingest(path)
+    assert handler.stats["summarized"] == before
+    assert again.sha256 == rec.sha256 and again.file_id != rec.file_id
+
+
+def test_read_range_bounds_and_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    handler = FileHandler()
+    rec = handler.ingest(path, exploration_summary="nothing here")
+    assert rec.root_node_id is None and rec.exploration_summary == "nothing here"
+    assert handler.read_range(rec.file_id, 0, 0) == ""
+    with pytest.raises(ValueError):
+        handler.read_range(rec.file_id, 0, 5)
+
+
+def _recording_compactor(monkeypatch, sources: list[str], **kwargs) -> Compactor:
+    monkeypatch.delenv("LCM_DISABLE_LLM", raising=False)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["messages"][1]["content"]
+        sources.append(prompt.split("\n\n", 1)[1])
+        return httpx.Response(200, json={"choices": [{"message": {"content": "chunk summary"}}]})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    return Compactor(token_counter=TokenCounter(encoding=None), api_key="test", client=client, **kwargs)
+
+
+@pytest.mark.parametrize("chunk_bytes, budget", [(None, 8000), (64 * 1024, 500)])
+def test_ingest_requests_fit_the_compactor_budget(tmp_path, monkeypatch, chunk_bytes, budget):
+    path = tmp_path / "big.log"
+    _write_log(path, [f"event {i} " + " ".join(f"field{j}={i * j}" for j in range(12)) for i in range(4000)])
+    sources: list[str] = []
+    compactor = _recording_compactor(monkeypatch, sources, max_source_tokens=budget)
+    kwargs = {} if chunk_bytes is None else {"chunk_bytes": chunk_bytes}
+    handler = FileHandler(compactor=compactor, dag=SummaryDAG(), max_workers=4, **kwargs)
+    rec = handler.ingest(path)
+
+    file_sources = [src for src in sources if src.startswith("file: ")]
+    assert len(file_sources) >= handler.stats["chunks"] > 1
+    assert max(compactor.token_counter(src) for src in file_sources) <= budget + 1  # + the "file:" role prefix
+    assert compactor.compress_stats["normal"] == len(sources)
+    assert "".join(handler.read_pointer(p) for p in handler.dag.expand(rec.root_node_id)) == path.read_text()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from lcm.compactor import AsyncCompactor, Compactor
+from lcm.engine import LCMEngine
+from lcm.metrics import NULL_METRICS, Metrics
+from lcm.store import Message
+from lcm.tokens import TokenCounter
+
+
+def test_histogram_snapshot_and_prometheus():
+    metrics = Metrics(buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 5.0):
+        metrics.observe("lcm_x_seconds", value, stage="soft")
+    metrics.inc("lcm_hard_stalls_total")
+    metrics.inc("lcm_hard_stalls_total", 2)
+    metrics.gauge("lcm_active_tokens", 123)
+
+    hist = metrics.histogram("lcm_x_seconds", stage="soft")
+    assert hist["count"] == 4 and hist["p50"] == 0.1 and hist["p99"] == 1.0
+    assert metrics.total("lcm_hard_stalls_total") == 3
+
+    snap = json.loads(metrics.to_json())
+    assert snap["gauges"] == [{"name": "lcm_active_tokens", "labels": {}, "value": 123}]
+    assert snap["histograms"][0]["buckets"] == {"0.01": 1, "0.1": 2, "1.0": 0, "+Inf": 1}
+
+    text = metrics.to_prometheus()
+    assert "# TYPE lcm_x_seconds histogram" in text
+    assert 'lcm_x_seconds_bucket{stage="soft",le="0.1"} 3' in text
+    assert 'lcm_x_seconds_bucket{stage="soft",le="+Inf"} 4' in text
+    assert "lcm_hard_stalls_total 3" in text
+
+
+def test_spans_nest_and_reach_hooks():
+    metrics = Metrics()
+    seen = []
+    metrics.add_span_hook(lambda span: seen.append((span.name, span.parent.name if span.parent else None, span.labels)))
+
+    with metrics.span("outer"):
+        with metrics.span("inner", stage="soft") as span:
+            span.label(status=200)
+
+    assert seen == [("inner", "outer", {"stage": "soft", "status": 200}), ("outer", None, {})]
+    assert metrics.histogram("inner_seconds", stage="soft", status=200)["count"] == 1
+
+
+def test_engine_records_latencies_gauges_and_stalls(tmp_path):
+    metrics = Metrics()
+    engine = LCMEngine(tmp_path / "store.jsonl", tau_soft=300, tau_hard=400, metrics=metrics)
+    for i in range(30):
+        engine.receive("user", " ".join(f"w{i}_{j}" for j in range(60)))
+    engine.get_message(engine.store.all()[0].id)
+    engine.close()
+
+    assert metrics.histogram("lcm_receive_seconds")["count"] == 30
+    assert metrics.histogram("lcm_add_message_seconds")["count"] == 30
+    assert metrics.histogram("lcm_store_append_seconds")["count"] == 30
+    assert metrics.histogram("lcm_store_read_seconds")["count"] >= 1
+    assert metrics.total("lcm_compaction_seconds") > 0
+    assert metrics.total("lcm_compress_total") == sum(engine.compactor.compress_stats.values())
+    assert metrics.total("lcm_hard_stalls_total") == metrics.histogram("lcm_hard_stall_seconds")["count"]
+
+    gauges = {g["name"]: g["value"] for g in metrics.snapshot()["gauges"]}
+    assert gauges["lcm_dag_nodes"] > 0 and gauges["lcm_dag_depth"] >= 1
+    assert 0 < gauges["lcm_active_tokens"] <= 400
+
+
+def _level_counts(metrics: Metrics) -> dict[str, float]:
+    return {c["labels"]["level"]: c["value"] for c in metrics.snapshot()["counters"] if c["name"] == "lcm_compress_total"}
+
+
+class _StubAsyncCompactor(AsyncCompactor):
+    async def normal_compress(self, messages, target_tokens=None):
+        return "normal " * 3
+
+    async def aggressive_compress(self, messages, target_tokens=None):
+        return "aggressive"
+
+
+def test_speculative_compress_counts_levels():
+    msgs = [Message(str(i), "2026-01-01T00:00:00+00:00", "user", "word " * 40) for i in range(4)]
+
+    metrics = Metrics()
+    comp = Compactor(token_counter=TokenCounter(encoding=None), speculative=True, metrics=metrics)
+    for target in (500, 500, 1):
+        comp.compress(msgs, target_tokens=target)
+    comp.close()
+    assert _level_counts(metrics) == {k: v for k, v in comp.compress_stats.items() if v}
+    assert _level_counts(metrics)["normal"] == 2
+
+    metrics = Metrics()
+    comp = _StubAsyncCompactor(token_counter=TokenCounter(encoding=None), speculative=True, metrics=metrics)
+    assert asyncio.run(comp.compress(msgs, target_tokens=2)) == ("aggressive", "aggressive")
+    asyncio.run(comp.aclose())
+    assert _level_counts(metrics) == {"aggressive": 1} and comp.compress_stats["aggressive"] == 1
+
+
+def test_engine_defaults_to_disabled_metrics(tmp_path):
+    engine = LCMEngine(tmp_path / "store.jsonl")
+    assert engine.metrics is NULL_METRICS and not engine.metrics.enabled
+    assert engine.store.metrics is engine.context.metrics is engine.compactor.metrics is NULL_METRICS
+    engine.receive("user", "hello")
+    engine.close()
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from lcm.operators import MapItemError, agentic_map, amap, iter_map, llm_map
+
+
+def test_llm_map_is_ordered_and_concurrent():
+    active, peak = 0, 0
+    lock = threading.Lock()
+
+    def slow_square(x):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02 * (5 - x % 5))  # later items finish first
+        with lock:
+            active -= 1
+        return x * x
+
+    out = llm_map(range(20), slow_square, max_workers=4)
+    assert out == [x * x for x in range(20)]
+    assert out.indices == list(range(20)) and out.ok
+    assert peak == 4
+
+
+def test_agentic_map_reports_failures_after_retries():
+    calls: dict[int, int] = {}
+
+    def flaky(x):
+        calls[x] = calls.get(x, 0) + 1
+        if x == 3 or (x == 5 and calls[x] == 1):
+            raise RuntimeError(f"bad {x}")
+        return x
+
+    out = agentic_map(range(8), flaky, retries=1, retry_delay=0)
+    assert out == [0, 1, 2, 4, 5, 6, 7]
+    assert out.indices == [0, 1, 2, 4, 5, 6, 7]
+    assert [(e.index, e.attempts, str(e.error)) for e in out.errors] == [(3, 2, "bad 3")]
+    assert calls[5] == 2
+
+    with pytest.raises(RuntimeError, match="bad 3"):
+        agentic_map(range(8), flaky, stop_on_error=True, retries=0)
+
+
+def test_agentic_map_does_not_retry_by_default():
+    calls: list[int] = []
+
+    def failing(x):
+        calls.append(x)
+        raise RuntimeError("side effect already happened")
+
+    out = agentic_map([7], failing, retry_delay=0)
+    assert calls == [7]
+    assert [(e.index, e.attempts) for e in out.errors] == [(0, 1)]
+
+
+def test_iter_map_times_out_and_streams_lazily():
+    pulled = []
+
+    def source():
+        for i in range(1000):
+            pulled.append(i)
+            yield i
+
+    def fn(x):
+        if x == 1:
+            time.sleep(0.3)
+        return x
+
+    stream = iter_map(source(), fn, max_workers=2, timeout=0.05)
+    first = [next(stream), next(stream)]
+    stream.close()
+    assert first[0] == 0
+    assert isinstance(first[1], MapItemError) and isinstance(first[1].error, TimeoutError)
+    assert len(pulled) <= 8  # bounded read-ahead, not the whole input
+
+
+def test_amap_bounds_concurrency_and_cancels_timeouts():
+    active, peak = 0, 0
+
+    async def fn(x):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            await asyncio.sleep(1 if x == 2 else 0.01)
+        finally:
+            active -= 1
+        return -x
+
+    out = asyncio.run(amap(range(10), fn, concurrency=3, timeout=0.1))
+    assert out == [-x for x in range(10) if x != 2]
+    assert [e.index for e in out.errors] == [2]
+    assert peak == 3
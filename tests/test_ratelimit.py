@@ -0,0 +1,54 @@
+import httpx
+
+from lcm.compactor import Compactor
+from lcm.ratelimit import RateLimiter
+from lcm.store import Message
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_throttles_requests_and_tokens():
+    clock = _FakeClock()
+    limiter = RateLimiter(requests_per_sec=2, tokens_per_min=600, clock=clock, sleep=clock.sleep)
+
+    for _ in range(4):
+        with limiter.slot(tokens=10):
+            pass
+    assert limiter.stats["requests"] == 4
+    assert limiter.stats["throttled"] == 2
+    assert sum(clock.slept) == 1.0  # two extra requests at 2 req/s
+
+    with limiter.slot(tokens=600):  # token budget exhausted: wait for the refill
+        pass
+    assert clock.slept[-1] > 0
+
+
+def test_compactor_retries_retryable_status_without_fixed_sleep(monkeypatch):
+    monkeypatch.delenv("LCM_DISABLE_LLM", raising=False)
+    calls = {"n": 0}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        if calls["n"] == 1:
+            return httpx.Response(429, headers={"retry-after": "0"}, text="slow down")
+        return httpx.Response(200, json={"choices": [{"message": {"content": "short summary"}}]})
+
+    limiter = RateLimiter(base_delay=0, sleep=lambda s: None)
+    comp = Compactor(api_key="test", client=httpx.Client(transport=httpx.MockTransport(handler)), rate_limiter=limiter)
+    msgs = [Message(id="1", timestamp="", role="user", content="hello " * 50)]
+
+    level, text = comp.compress(msgs, target_tokens=100)
+    assert (level, text) == ("normal", "[NORMAL] short summary")
+    assert limiter.stats["retried"] == 1
+    assert calls["n"] == 2
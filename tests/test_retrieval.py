@@ -0,0 +1,64 @@
+from lcm.dag import SummaryDAG
+from lcm.engine import LCMEngine
+from lcm.retrieval import HierarchicalRetriever, lexical_scores
+from lcm.store import ImmutableStore
+from lcm.tokens import TokenCounter
+
+TOPICS = ["billing", "postgres", "redis", "kafka", "oauth", "grafana", "terraform", "docker"]
+
+
+def _build(tmp_path):
+    store = ImmutableStore(tmp_path / "store.jsonl")
+    dag = SummaryDAG(token_counter=TokenCounter(encoding=None))
+    level1 = []
+    for topic in TOPICS:
+        for part in range(4):
+            msgs = [store.append("user", f"{topic} detail {part}-{i} {'filler ' * 5}") for i in range(4)]
+            level1.append(dag.add_summary(msgs, f"{topic} discussion part {part}"))
+    level2 = [
+        dag.add_summary([], " ".join(TOPICS[i : i + 2]) + " overview", child_node_ids=[n.id for n in level1[i * 4 : i * 4 + 8]])
+        for i in range(0, len(TOPICS), 2)
+    ]
+    return store, dag, level1, level2
+
+
+def test_roots_and_children(tmp_path):
+    _, dag, level1, level2 = _build(tmp_path)
+    assert [n.id for n in dag.roots()] == [n.id for n in level2]
+    assert [n.id for n in dag.children(level2[0].id)] == [n.id for n in level1[:8]]
+    assert len(dag.leaf_message_ids(level1[0].id)) == 4
+    assert dag.leaf_message_ids(level2[0].id) == []
+
+
+def test_beam_descent_touches_a_fraction_of_the_history(tmp_path):
+    store, dag, _, _ = _build(tmp_path)
+    retriever = HierarchicalRetriever(dag, store, beam_width=2)
+    result = retriever.retrieve("redis detail 2-3", k=3)
+
+    assert result.messages[0].content.startswith("redis detail 2-3")
+    assert all("redis" in m.content for m in result.messages)
+    total_messages = len(TOPICS) * 16
+    assert result.messages_scored <= 2 * 4 < total_messages
+    assert result.nodes_scored < len(dag.nodes)
+
+
+def test_no_match_returns_nothing(tmp_path):
+    store, dag, _, _ = _build(tmp_path)
+    result = HierarchicalRetriever(dag, store).retrieve("zeppelin")
+    assert result.messages == [] and result.messages_scored == 0
+    assert lexical_scores("", ["anything"]) == [0.0]
+
+
+def test_lexical_scores_match_non_ascii_words():
+    scores = lexical_scores("миграции", ["план миграции базы", "deploy notes"])
+    assert scores[0] > 0 and scores[1] == 0
+    assert lexical_scores("caf", ["un café noir"]) == [0.0]
+
+
+def test_engine_retrieve_after_compaction(tmp_path):
+    engine = LCMEngine(tmp_path / "store.jsonl", tau_soft=60, tau_hard=100)
+    for i in range(30):
+        engine.receive("user", f"routine note n{i} " + "words " * 10)
+    engine.context.drain()
+    hits = engine.retrieve("n27", k=2)
+    assert [m.content.split()[2] for m in hits] == ["n27"]
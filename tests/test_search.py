@@ -0,0 +1,74 @@
+import pytest
+
+from lcm.engine import LCMEngine
+from lcm.search import BM25Index, tokenize
+from lcm.store import ImmutableStore
+
+
+def test_tokenize_words_and_cjk_bigrams():
+    assert tokenize("Deploy v2 to Kubernetes!") == ["deploy", "v2", "to", "kubernetes"]
+    assert tokenize("压缩记忆") == ["压缩", "缩记", "记忆"]
+    assert tokenize("Миграции БД, café") == ["миграции", "бд", "café"]
+    assert tokenize("v2压缩") == ["v2", "压缩"]
+
+
+def test_bm25_finds_non_ascii_words(tmp_path):
+    index = BM25Index(tmp_path / "idx.bm25")
+    index.add_many([("ru", "Запустили миграции базы"), ("fr", "un café noir"), ("en", "caf is not a word")])
+    assert [mid for mid, _ in index.search("миграции", 5)] == ["ru"]
+    assert [mid for mid, _ in index.search("caf", 5)] == ["en"]
+    index.close()
+
+
+def test_bm25_ranks_rare_terms_and_shorter_docs_higher(tmp_path):
+    index = BM25Index(tmp_path / "idx.bm25")
+    index.add_many(
+        [
+            ("a", "the cat sat on the mat"),
+            ("b", "the dog chased the cat around the whole garden all afternoon"),
+            ("c", "the dog slept"),
+            ("d", "nothing relevant here"),
+        ]
+    )
+    assert [mid for mid, _ in index.search("cat", k=5)] == ["a", "b"]
+    assert index.search("dog cat", k=1)[0][0] == "b"
+    assert index.search("missing", k=3) == []
+
+
+def test_store_search_persists_and_catches_up(tmp_path):
+    path = tmp_path / "messages.jsonl"
+    with ImmutableStore(path, search_index=True) as store:
+        store.append("user", "we picked postgres for billing")
+        store.append_many([("assistant", "noted, postgres it is"), ("user", "also add redis caching")])
+    reopened = ImmutableStore(path, search_index=True)
+    assert [m.content for m in reopened.search("redis")] == ["also add redis caching"]
+    assert len(reopened.search("postgres")) == 2
+    reopened.close()
+
+    # Drop the sidecar tail as if the process died between the log write and the index write.
+    sidecar = tmp_path / "messages.jsonl.bm25"
+    lines = sidecar.read_text(encoding="utf-8").splitlines(keepends=True)
+    sidecar.write_text("".join(lines[:1]), encoding="utf-8")
+    caught_up = ImmutableStore(path, search_index=True)
+    assert [m.content for m in caught_up.search("redis caching", k=1)] == ["also add redis caching"]
+    assert len(caught_up.search_index) == 3
+
+
+def test_engine_search_returns_messages(tmp_path):
+    engine = LCMEngine(tmp_path / "store.jsonl", tau_soft=50, tau_hard=80, search_index=True)
+    for i in range(40):
+        engine.receive("user", f"filler turn {i} about nothing in particular")
+    engine.receive("user", "the launch code is tangerine")
+    engine.context.drain()
+    hits = engine.search("tangerine launch", k=3)
+    assert [m.content for m in hits] == ["the launch code is tangerine"]
+
+
+def test_engine_search_index_is_opt_in(tmp_path):
+    engine = LCMEngine(tmp_path / "store.jsonl")
+    engine.receive("user", "no index here")
+    assert engine.store.search_index is None
+    assert not (tmp_path / "store.jsonl.bm25").exists()
+    with pytest.raises(RuntimeError):
+        engine.search("index")
+    engine.close()
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from lcm.sessions import SessionManager
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _turn(i):
+    return f"turn {i} " + "detail " * 12
+
+
+def test_sessions_share_resources_and_evict_lru(tmp_path):
+    with SessionManager(tmp_path, tau_soft=80, tau_hard=140, max_sessions=2) as manager:
+        for i in range(12):
+            for sid in ("a", "b"):
+                manager.receive(sid, "user", _turn(i))
+        engines = [manager.get("a"), manager.get("b")]
+        assert engines[0].compactor is engines[1].compactor is manager.compactor
+        assert engines[0].context._executor is manager.executor
+        before = engines[0].context.get_active_context()["token_estimate"]
+
+        manager.receive("c", "user", "hello")
+        assert "a" not in manager and len(manager) == 2
+        assert manager.stats["evictions"] == 1
+
+        # Transparent reload from the checkpoint, without replaying or re-compacting history.
+        calls = sum(manager.compactor.compress_stats.values())
+        active = manager.receive("a", "user", "back again")
+        assert sum(manager.compactor.compress_stats.values()) == calls
+        assert active["recent_messages"][-1].content == "back again"
+        assert active["token_estimate"] >= before
+        assert manager.stats["loads"] == 4
+
+
+def test_idle_sessions_are_evicted(tmp_path):
+    clock = _Clock()
+    with SessionManager(tmp_path, idle_timeout=10, clock=clock) as manager:
+        manager.receive("a", "user", "one")
+        clock.now = 5
+        manager.receive("b", "user", "two")
+        clock.now = 12
+        manager.evict_idle()
+        assert "a" not in manager and "b" in manager
+        assert [m.content for m in manager.get("a").store.all()] == ["one"]
+
+
+def test_concurrent_receives_across_sessions(tmp_path):
+    with SessionManager(tmp_path, tau_soft=80, tau_hard=140, max_sessions=3) as manager:
+        def worker(sid):
+            for i in range(15):
+                manager.receive(sid, "user", _turn(i))
+
+        threads = [threading.Thread(target=worker, args=(f"s{n}",)) for n in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for n in range(6):
+            assert len(manager.get(f"s{n}").store) == 15
+
+
+def test_session_ids_are_validated(tmp_path):
+    with SessionManager(tmp_path) as manager:
+        with pytest.raises(ValueError):
+            manager.receive("../escape", "user", "x")
+
+
+def test_slow_load_does_not_block_other_sessions(tmp_path):
+    entered, release = threading.Event(), threading.Event()
+
+    class SlowLoad(SessionManager):
+        def _load(self, session_id):
+            if session_id == "slow":
+                entered.set()
+                assert release.wait(5)
+            return super()._load(session_id)
+
+    with SlowLoad(tmp_path) as manager:
+        loader = threading.Thread(target=manager.receive, args=("slow", "user", "hi"))
+        loader.start()
+        assert entered.wait(5)
+        waiter = threading.Thread(target=manager.receive, args=("slow", "user", "second"))
+        waiter.start()
+        fast = threading.Thread(target=manager.receive, args=("fast", "user", "hello"))
+        fast.start()
+        fast.join(2)
+        assert not fast.is_alive()
+        release.set()
+        loader.join()
+        waiter.join()
+        assert len(manager.get("slow").store) == 2
+        assert manager.stats["loads"] == 2
+
+
+def test_reload_waits_for_slow_close(tmp_path):
+    with SessionManager(tmp_path, max_sessions=1) as manager:
+        manager.receive("a", "user", "one")
+        engine = manager.get("a")
+        original_close = engine.close
+
+        def slow_close():
+            time.sleep(0.2)
+            original_close()
+
+        engine.close = slow_close
+        evictor = threading.Thread(target=manager.receive, args=("b", "user", "evicts a"))
+        evictor.start()
+        time.sleep(0.05)
+        manager.receive("a", "user", "two")
+        evictor.join()
+        assert [m.content for m in manager.get("a").store.all()] == ["one", "two"]
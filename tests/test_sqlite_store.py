@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from lcm.engine import LCMEngine
+from lcm.sqlite_store import SQLiteStore
+
+
+def test_append_lookup_and_time_range(tmp_path):
+    store = SQLiteStore(tmp_path / "store.db")
+    m1 = store.append("user", "first")
+    m2, m3 = store.append_many([("assistant", "second"), ("user", "third", "custom-id")])
+
+    assert m3.id == "custom-id"
+    assert store.get_by_id(m1.id) == m1
+    assert store.get_by_id("missing") is None
+    assert store.get_by_ids([m3.id, "missing", m1.id, m3.id]) == [m3, m1, m3]
+    t1, t2 = (datetime.fromisoformat(m.timestamp) for m in (m1, m2))
+    assert store.query_time_range(t1, t2) == [m1, m2]
+    assert store.query_time_range(t2 + timedelta(days=1), t2 + timedelta(days=2)) == []
+    with pytest.raises(ValueError):
+        store.query_time_range(t1.replace(tzinfo=None), t2)
+    with pytest.raises(ValueError):
+        store.append("user", "dup", message_id="custom-id")
+    assert len(store) == 3
+    store.close()
+
+
+def test_wal_and_append_only_triggers(tmp_path):
+    path = tmp_path / "store.db"
+    store = SQLiteStore(path)
+    msg = store.append("user", "immutable")
+    store.close()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with pytest.raises(sqlite3.DatabaseError, match="append-only"):
+        conn.execute("UPDATE messages SET content = 'edited'")
+    with pytest.raises(sqlite3.DatabaseError, match="append-only"):
+        conn.execute("DELETE FROM messages")
+    conn.close()
+    reopened = SQLiteStore(path)
+    assert reopened.get_by_id(msg.id).content == "immutable"
+    reopened.close()
+
+
+def test_fts_search_backfills_and_tracks_appends(tmp_path):
+    path = tmp_path / "store.db"
+    plain = SQLiteStore(path)
+    old = plain.append("user", "the deployment uses kubernetes")
+    plain.append("user", "lunch was pasta")
+    with pytest.raises(RuntimeError):
+        plain.search("kubernetes")
+    plain.close()
+
+    store = SQLiteStore(path, search_index=True)
+    new = store.append("assistant", "kubernetes kubernetes rollout")
+    assert [m.id for m in store.search("Kubernetes", k=5)] == [new.id, old.id]
+    assert store.search('"; DROP TABLE messages; --') == []
+    assert store.search("   ") == []
+    store.close()
+
+
+def test_concurrent_readers_and_readonly_handle(tmp_path):
+    path = tmp_path / "store.db"
+    store = SQLiteStore(path)
+    ids = [m.id for m in store.append_many([("user", f"m{i}") for i in range(200)])]
+    reader = SQLiteStore(path, readonly=True)
+    errors = []
+
+    def read() -> None:
+        try:
+            assert [m.id for m in reader.get_by_ids(ids)] == ids
+        except Exception as exc:  # pragma: no cover - surfaced below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for t in threads:
+        t.start()
+    store.append("user", "written while reading")
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(reader) == 201
+    reader.close()
+    store.close()
+
+
+def test_engine_sqlite_backend_checkpoint_and_search(tmp_path):
+    path = tmp_path / "store.db"
+    engine = LCMEngine(path, tau_soft=300, tau_hard=400, checkpoint=True, backend="sqlite", search_index=True)
+    assert isinstance(engine.store, SQLiteStore)
+    for i in range(20):
+        engine.receive("user", f"turn {i} " + " ".join(f"w{i}_{j}" for j in range(40)))
+    engine.close()
+
+    engine = LCMEngine(path, tau_soft=300, tau_hard=400, checkpoint=True, backend="sqlite", search_index=True)
+    assert engine._applied_position == engine.store.end_position == (0, 20)
+    engine.receive("user", "marker zebra")
+    assert engine.search("zebra")[0].content == "marker zebra"
+    engine.close()
+
+    with pytest.raises(ValueError):
+        LCMEngine(tmp_path / "other.db", backend="parquet")
@@ -1,5 +1,9 @@
+import random
+import threading
 from datetime import datetime, timedelta, timezone
 
+import pytest
+
 from lcm.store import ImmutableStore
 
 
@@ -33,3 +37,164 @@ def test_get_by_ids_preserves_order(tmp_path):
 
     out = store.get_by_ids([m3.id, m1.id])
     assert [m.id for m in out] == [m3.id, m1.id]
+
+
+def test_index_rebuilds_when_sidecar_missing_or_stale(tmp_path):
+    path = tmp_path / "store.jsonl"
+    store = ImmutableStore(path)
+    m1 = store.append("user", "a")
+    m2 = store.append("assistant", "b")
+
+    store.index_path.unlink()
+    reopened = ImmutableStore(path)
+    assert reopened.get_by_id(m2.id).content == "b"
+
+    # A record written behind the sidecar's back is picked up on the next open.
+    with path.open("a", encoding="utf-8") as f:
+        f.write('{"id": "late", "timestamp": "2026-01-01T00:00:00+00:00", "role": "user", "content": "c"}\n')
+    reopened = ImmutableStore(path)
+    assert [m.id for m in reopened.get_by_ids(["late", m1.id])] == ["late", m1.id]
+
+
+def test_query_time_range_uses_sparse_index(tmp_path):
+    store = ImmutableStore(tmp_path / "store.jsonl", time_index_stride=2)
+    msgs = [store.append("user", str(i)) for i in range(7)]
+
+    start = datetime.fromisoformat(msgs[3].timestamp)
+    end = datetime.fromisoformat(msgs[5].timestamp)
+    out = store.query_time_range(start, end)
+    assert [m.content for m in out] == ["3", "4", "5"]
+
+    reopened = ImmutableStore(tmp_path / "store.jsonl", time_index_stride=2)
+    assert len(reopened._time_offsets) == 4
+    assert [m.content for m in reopened.query_time_range(start, end)] == ["3", "4", "5"]
+
+
+def test_append_many_group_commit(tmp_path):
+    with ImmutableStore(tmp_path / "store.jsonl", durability="batch") as store:
+        msgs = store.append_many([("user", "a"), ("assistant", "b", "fixed-id")])
+        assert msgs[1].id == "fixed-id"
+        assert store._synced_seq == store._written_seq == 1
+        assert [m.content for m in store.get_by_ids([m.id for m in msgs])] == ["a", "b"]
+
+    reopened = ImmutableStore(tmp_path / "store.jsonl")
+    assert [m.id for m in reopened.all()] == [m.id for m in msgs]
+
+    with pytest.raises(ValueError):
+        ImmutableStore(tmp_path / "other.jsonl", durability="sometimes")
+
+
+def test_segments_roll_over_and_stay_lossless(tmp_path):
+    path = tmp_path / "store.jsonl"
+    store = ImmutableStore(path, segment_bytes=400, time_index_stride=3)
+    msgs = [store.append("user", f"message {i} " + "x" * 40) for i in range(20)]
+    store.close()
+
+    sealed = sorted(store.segments_dir.glob("*.seg"))
+    assert len(sealed) >= 2
+    assert path.stat().st_size < 400
+
+    reopened = ImmutableStore(path, segment_bytes=400, time_index_stride=3)
+    assert [m.id for m in reopened.all()] == [m.id for m in msgs]
+    assert reopened.get_by_id(msgs[0].id) == msgs[0]
+    assert reopened.get_by_ids([msgs[19].id, msgs[2].id]) == [msgs[19], msgs[2]]
+
+    start = datetime.fromisoformat(msgs[6].timestamp)
+    end = datetime.fromisoformat(msgs[13].timestamp)
+    assert reopened.query_time_range(start, end) == msgs[6:14]
+
+    # Index sidecars are derived data: dropping them rebuilds from the sealed segments.
+    reopened.close()
+    reopened.index_path.unlink()
+    assert ImmutableStore(path, segment_bytes=400).get_by_id(msgs[5].id) == msgs[5]
+
+
+def test_sealed_lookup_inflates_only_its_block(tmp_path):
+    path = tmp_path / "store.jsonl"
+    store = ImmutableStore(path, segment_bytes=4000, segment_block_bytes=300)
+    msgs = store.append_many([("user", f"message {i} " + "x" * 40) for i in range(60)])
+    store.close()
+
+    reopened = ImmutableStore(path, segment_bytes=4000, segment_block_bytes=300)
+    footer = reopened._footers[0]
+    assert footer["codec"] == "zlib-blocks" and len(footer["block_raw"]) > 5
+    reopened._block_cache.clear()
+    assert reopened.get_by_id(msgs[30].id) == msgs[30]
+    assert len(reopened._block_cache) == 1
+    assert reopened.get_by_ids([msgs[59].id, msgs[0].id]) == [msgs[59], msgs[0]]
+    assert list(reopened.iter_from((0, 0))) == msgs
+    start, end = (datetime.fromisoformat(msgs[i].timestamp) for i in (12, 40))
+    assert reopened.query_time_range(start, end) == msgs[12:41]
+
+
+def test_iter_from_end_position_spans_sealed_segments(tmp_path):
+    store = ImmutableStore(tmp_path / "store.jsonl", segment_bytes=400)
+    first = [store.append("user", f"early {i} " + "x" * 40) for i in range(5)]
+    mark = store.end_position
+    later = [store.append("user", f"late {i} " + "x" * 40) for i in range(12)]
+
+    assert len(store) == 17
+    assert list(store.iter_from((0, 0))) == first + later
+    assert list(store.iter_from(mark)) == later
+    assert list(store.iter_from(store.end_position)) == []
+
+
+def test_concurrent_writers_keep_time_order(tmp_path):
+    store = ImmutableStore(tmp_path / "store.jsonl", time_index_stride=8, segment_bytes=64 * 1024)
+
+    def writer(w: int) -> None:
+        for i in range(100):
+            store.append_many([("user", f"w{w} b{i} r{j}") for j in range(3)])
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stored = store.all()
+    stamps = [datetime.fromisoformat(m.timestamp) for m in stored]
+    assert stamps == sorted(stamps)
+    rng = random.Random(3)
+    for _ in range(50):
+        lo, hi = sorted(rng.sample(stamps, 2))
+        assert store.query_time_range(lo, hi) == [m for m, ts in zip(stored, stamps) if lo <= ts <= hi]
+
+
+def test_reads_stay_consistent_while_segments_seal(tmp_path):
+    store = ImmutableStore(tmp_path / "store.jsonl", segment_bytes=4000, segment_block_bytes=1000)
+    ids: list[str] = []
+    done = threading.Event()
+    errors: list[BaseException] = []
+
+    def reader() -> None:
+        rng = random.Random(threading.get_ident())
+        try:
+            while not done.is_set():
+                if ids:
+                    known = len(ids)
+                    mid = rng.choice(ids)
+                    assert store.get_by_id(mid).id == mid
+                    assert len(list(store.iter_from((0, 0)))) >= known
+        except BaseException as exc:  # noqa: BLE001 - surfaced by the assertion below
+            errors.append(exc)
+
+    readers = [threading.Thread(target=reader) for _ in range(3)]
+    for t in readers:
+        t.start()
+    try:
+        for i in range(300):
+            ids.extend(m.id for m in store.append_many([("user", f"message {i} {j} " + "x" * 60) for j in range(4)]))
+        # A lazy scan that spans a seal keeps reading the records it started from.
+        seen = []
+        for msg in store.iter_from((0, 0)):
+            seen.append(msg.id)
+            if len(seen) % 50 == 0:
+                store.append_many([("user", "late " + "y" * 200) for _ in range(8)])
+    finally:
+        done.set()
+        for t in readers:
+            t.join()
+    assert errors == []
+    assert seen[: len(ids)] == ids
+    assert len(store._footers) > 10
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import random
+import threading
+from datetime import datetime
+
+import pytest
+
+from lcm.engine import STORE_BACKENDS
+from lcm.metrics import Metrics
+
+
+@pytest.fixture(params=sorted(STORE_BACKENDS))
+def open_store(request, tmp_path):
+    opened = []
+
+    def _open(**kwargs):
+        store = STORE_BACKENDS[request.param](tmp_path / f"store.{request.param}", **kwargs)
+        opened.append(store)
+        return store
+
+    yield _open
+    for store in opened:
+        store.close()
+
+
+def test_duplicate_ids_are_rejected_atomically(open_store):
+    store = open_store()
+    first = store.append("user", "first", message_id="a")
+    (second,) = store.append_many([("assistant", "second", "b")])
+
+    with pytest.raises(ValueError):
+        store.append("user", "again", message_id="a")
+    with pytest.raises(ValueError):
+        store.append_many([("user", "fresh", "c"), ("user", "stale", "b")])
+    with pytest.raises(ValueError):
+        store.append_many([("user", "x", "d"), ("user", "y", "d")])
+
+    assert store.all() == [first, second] and len(store) == 2
+    assert store.get_by_id("c") is None and store.get_by_id("d") is None
+    assert store.get_by_id("a") == first
+    third = store.append("user", "third", message_id="c")
+    store.close()
+
+    reopened = open_store()
+    assert reopened.all() == [first, second, third]
+    with pytest.raises(ValueError):
+        reopened.append("user", "again", message_id="a")
+
+
+def test_positions_resume_after_reopen(open_store):
+    store = open_store()
+    early = store.append_many([("user", "one"), ("assistant", "two")])
+    mark = store.end_position
+    late = store.append("user", "three")
+    assert list(store.iter_from((0, 0))) == early + [late]
+    store.close()
+
+    reopened = open_store()
+    assert list(reopened.iter_from(mark)) == [late]
+    assert list(reopened.iter_from(reopened.end_position)) == []
+
+
+def test_search_matches_cjk_and_non_ascii_words(open_store):
+    store = open_store(search_index=True)
+    db, zip_, ru, cafe = store.append_many(
+        [
+            ("user", "我们需要迁移数据库到新的集群"),
+            ("assistant", "已经完成压缩和归档"),
+            ("user", "Запустили миграции базы"),
+            ("user", "un café noir"),
+        ]
+    )
+    assert [m.id for m in store.search("数据库")] == [db.id]
+    assert [m.id for m in store.search("压缩")] == [zip_.id]
+    assert [m.id for m in store.search("миграции")] == [ru.id]
+    assert [m.id for m in store.search("café")] == [cafe.id]
+    assert store.search("caf") == []
+
+
+def test_concurrent_writers_keep_time_order(open_store):
+    store = open_store()
+
+    def writer(w: int) -> None:
+        for i in range(60):
+            store.append_many([("user", f"w{w} b{i} r{j}") for j in range(3)])
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stored = store.all()
+    stamps = [datetime.fromisoformat(m.timestamp) for m in stored]
+    assert len(stored) == 6 * 60 * 3 and stamps == sorted(stamps)
+    rng = random.Random(3)
+    for _ in range(30):
+        lo, hi = sorted(rng.sample(stamps, 2))
+        assert store.query_time_range(lo, hi) == [m for m, ts in zip(stored, stamps) if lo <= ts <= hi]
+
+
+def test_reads_emit_store_read_spans(open_store):
+    metrics = Metrics()
+    store = open_store(search_index=True, metrics=metrics)
+    first, second = store.append_many([("user", "alpha"), ("user", "beta")])
+    start, end = (datetime.fromisoformat(m.timestamp) for m in (first, second))
+
+    store.get_by_id(first.id)
+    store.get_by_ids([second.id])
+    store.query_time_range(start, end)
+    store.search("alpha")
+    assert metrics.histogram("lcm_store_read_seconds")["count"] == 4
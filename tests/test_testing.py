@@ -0,0 +1,30 @@
+from lcm.compactor import Compactor
+from lcm.engine import LCMEngine
+from lcm.ratelimit import RateLimiter
+from lcm.testing import FakeLLMServer
+
+
+def test_fake_server_drives_compaction_with_throttling(tmp_path, monkeypatch):
+    monkeypatch.delenv("LCM_DISABLE_LLM", raising=False)
+    with FakeLLMServer(latency_ms=5, rate_limit_rps=50, summary_words=5, seed=1) as server:
+        limiter = RateLimiter(base_delay=0.01)
+        comp = Compactor(api_base=server.api_base, api_key="test", rate_limiter=limiter)
+        engine = LCMEngine(tmp_path / "store.jsonl", tau_soft=60, tau_hard=120, compactor=comp)
+        for i in range(30):
+            active = engine.receive("user", f"turn {i} " + "word " * 30)
+        engine.context.drain()
+
+    assert active["token_estimate"] <= 120
+    assert server.stats["ok"] >= 1
+    assert comp.compress_stats["normal"] >= 1
+    assert server.stats["throttled"] == limiter.stats["retried"]
+    assert all(node.content.startswith("[NORMAL] user: turn") for node in engine.dag.nodes.values() if node.level == 1)
+
+
+def test_fake_server_injects_errors(monkeypatch):
+    monkeypatch.delenv("LCM_DISABLE_LLM", raising=False)
+    with FakeLLMServer(latency_ms=0, error_rate=1.0, error_status=400) as server:
+        comp = Compactor(api_base=server.api_base, api_key="test")
+        text = comp.normal_compress([])
+    assert text == "[NORMAL] "  # 400 is not retryable: falls back to truncation
+    assert server.stats == {"requests": 1, "ok": 0, "errors": 1, "throttled": 0}
@@ -0,0 +1,27 @@
+from lcm.compactor import Compactor
+from lcm.tokens import TokenCounter
+
+
+def test_word_count_fallback_and_memo():
+    counter = TokenCounter(encoding="no-such-encoding")
+    assert counter.backend == "words"
+    assert counter.count_many(["a b c", "", "a b c", "d"]) == [3, 0, 3, 1]
+    assert counter.stats == {"hits": 1, "misses": 3}  # duplicates within a batch are counted once
+
+    assert counter("a b c") == 3
+    assert counter.stats["hits"] == 2
+
+
+def test_lru_is_bounded_and_custom_counter_is_wrapped():
+    calls: list[str] = []
+
+    def chars(text: str) -> int:
+        calls.append(text)
+        return len(text)
+
+    comp = Compactor(token_counter=chars)
+    assert isinstance(comp.token_counter, TokenCounter)
+    comp.token_counter.cache_size = 2
+    assert comp.token_counter.count_many(["aa", "bbb", "aa", "c"]) == [2, 3, 2, 1]
+    assert calls == ["aa", "bbb", "c"]
+    assert len(comp.token_counter._cache) == 2